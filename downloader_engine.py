@@ -4,25 +4,348 @@ Handles all download, transcoding, and hardware acceleration logic.
 Updated for 2025 YouTube Bot Protection bypass with Browser Cookies.
 """
 
-import yt_dlp
 import subprocess
+import sys
 import os
-import re
 import platform
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import queue
 import time
 import hashlib
+import threading
+from dataclasses import dataclass
+import json
+import functools
+import tempfile
+import shutil
+import socket
+import errno
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Optional: NVIDIA's Python bindings drive NVDEC/NVENC directly, keeping
+# both engines busier than FFmpeg does. FFmpeg is used when unavailable.
+try:
+    import PyNvVideoCodec as nvc
+except ImportError:
+    nvc = None
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+# Translation table that strips characters not allowed in Windows/macOS filenames
+INVALID_FILENAME_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+
+# YouTube video/playlist/shorts/embed URL, found anywhere inside pasted or
+# dropped text. The scheme is optional ("youtube.com/watch?v=..."); the
+# lookbehind keeps hosts like notyoutube.com from matching.
+YOUTUBE_URL_RE = re.compile(
+    r'(?<![\w.\-/])(?:https?://)?(?:[\w-]+\.)?'
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?|shorts/|playlist\?|live/|embed/)|youtu\.be/)[\w\-?=&./%]+'
+)
+
+# yt-dlp download tuning: larger buffers/chunks and parallel fragment fetches.
+# 10 MiB chunks stay under YouTube's throttling threshold.
+YDL_PERF_OPTS = {
+    'buffersize': 1 << 16,
+    'http_chunk_size': 10 * 1024 * 1024,
+    'concurrent_fragment_downloads': 8,
+    'retries': 10,
+    'fragment_retries': 10,
+}
+
+# Codecs every NVENC-era GPU decodes on NVDEC. Only these keep their frames in
+# VRAM; anything else may be decoded in software and land in system memory.
+CUDA_FRAME_CODECS = ("h264", "hevc")
+
+# yt-dlp vcodec / FFprobe codec_name prefixes -> codec
+CODEC_PREFIXES = (
+    ("avc", "h264"), ("h264", "h264"), ("hev", "hevc"), ("hvc", "hevc"),
+    ("vp09", "vp9"), ("vp9", "vp9"), ("av01", "av1"), ("av1", "av1"),
+)
+
+# NVENC lookahead depth. With CUDA-decoded input the encoder holds that many
+# decoder surfaces, so the decoder pool gets the same number of extra frames.
+NVENC_LOOKAHEAD = 20
+
+# libx264 (preset, crf) per encode speed tier. veryfast at crf 20 is
+# visually indistinguishable from slow for YouTube sources at ~3x the speed.
+X264_SPEED_PRESETS = {
+    'archive': ('slow', '18'),
+    'balanced': ('veryfast', '20'),
+    'fast': ('ultrafast', '22'),
+}
+
+# h264_nvenc (preset, tune, cq, multipass) per encode speed tier
+NVENC_SPEED_PRESETS = {
+    'archive': ('p5', 'hq', '19', 'fullres'),
+    'balanced': ('p4', 'hq', '21', 'qres'),
+    'fast': ('p1', 'll', '23', None),
+}
+
+# Result used when FFprobe fails
+PROBE_FALLBACK = {
+    'fps': 30, 'fps_exact': None, 'duration': 0, 'codec_name': None, 'pix_fmt': None, 'width': 0, 'height': 0, 'is_cfr': False,
+    'audio_codec': None, 'audio_bitrate': 0,
+}
+
+# AAC at or above this bitrate is copied instead of re-encoded
+MIN_COPY_AUDIO_BITRATE = 128000
+
+# Output file suffix of the CFR mode per video codec
+CFR_SUFFIXES = {"h264": "_CFR.mp4", "hevc": "_HEVC_CFR.mp4"}
+
+# Maximum video height per resolution choice
+RESOLUTION_HEIGHTS = {
+    "4K (2160p)": 2160,
+    "1080p (Full HD)": 1080,
+    "720p (HD)": 720,
+}
+
+# yt-dlp settings per output format. A template of None means the
+# intermediate TEMP_TEMPLATE (the encode stage writes the final file).
+DOWNLOAD_MODES = {
+    'passthrough': {
+        'template': '%(title)s.%(ext)s', 'merge': 'mp4', 'android_client': True,
+        'postprocessors': [{'key': 'FFmpegMetadata', 'add_metadata': True}],
+    },
+    'h264_cfr': {'template': None, 'merge': 'mkv', 'android_client': False, 'postprocessors': []},
+    'prores': {'template': None, 'merge': 'mkv', 'android_client': True, 'postprocessors': []},
+    'hevc10': {'template': None, 'merge': 'mkv', 'android_client': True, 'postprocessors': []},
+}
+
+# Errors worth retrying (network hiccups), alongside yt-dlp's DownloadError.
+# Anything else - missing FFmpeg, permissions, full disk, bad URL - fails immediately.
+TRANSIENT_ERRORS = (subprocess.CalledProcessError, ConnectionError, TimeoutError)
+
+# yt-dlp reports permanent failures as DownloadError too; these never get a retry
+PERMANENT_ERROR_MARKERS = (
+    "private video", "video unavailable", "this video is not available", "members-only",
+    "sign in to confirm your age", "has been removed", "unsupported url", "is not a valid url",
+    "requested format is not available", "no space left on device",
+)
+PERMANENT_ERRNOS = (errno.ENOSPC, errno.EACCES, errno.EROFS)
+
+# Machine-readable progress on stdout; stderr carries errors only.
+# (No -stats_period: it needs FFmpeg 4.4+, and the default period is fine.)
+FFMPEG_PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats", "-loglevel", "error"]
+
+# Short clips encoded on a hardware encoder are grouped into one FFmpeg
+# process, paying encoder session setup once per batch
+BATCH_MAX_JOBS = 8
+SHORT_CLIP_SECONDS = 120
+# A partial batch is encoded once no download has finished for this long
+BATCH_FLUSH_SECONDS = 2
+
+# Concurrent NVENC sessions GeForce drivers allow (8 on drivers from 2024 on,
+# 5 on older ones). Every clip of a batch opens its own session.
+NVENC_MAX_SESSIONS = 5
+
+# Minimum seconds between progress updates sent to the UI queue
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# Common subprocess options: no stdin, no inherited handles, no console window on Windows
+SUBPROCESS_KW = {'stdin': subprocess.DEVNULL, 'close_fds': True}
+if platform.system() == "Windows":
+    SUBPROCESS_KW['creationflags'] = subprocess.CREATE_NO_WINDOW
+
+# On-disk cache for FFmpeg capability probes, keyed by the FFmpeg build
+CAPS_CACHE_FILE = Path.home() / ".cache" / "yt_dlp_pp" / "caps.json"
+# Bump when new capabilities are probed so older caches are refreshed
+CAPS_CACHE_VERSION = 3
+
+# Intermediate downloads live on the system temp volume (tmpfs on many
+# Linux systems, the local SSD on Windows) instead of the output drive
+TEMP_DIR = Path(tempfile.gettempdir()) / "yt_dlp_pp"
+
+# On-disk cache of fetched titles/thumbnails, keyed by URL
+META_CACHE_FILE = Path.home() / ".cache" / "yt_dlp_pp" / "meta.json"
+META_CACHE_TTL = 24 * 3600
+# Seconds to collect fetched metadata before writing the cache file, so a
+# pasted playlist causes one write instead of one per video
+META_SAVE_DELAY = 2
+
+# Metadata fetches in flight at once; more than this invites HTTP 429s
+FETCH_CONCURRENCY = 8
+
+
+# DNS answers are reused for this long; yt-dlp resolves the same YouTube
+# hosts for every request of every job
+DNS_CACHE_TTL = 300
+_dns_cache: Dict[tuple, tuple] = {}
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """socket.getaddrinfo with a small TTL cache"""
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    cached = _dns_cache.get(key)
+    if cached and now - cached[0] < DNS_CACHE_TTL:
+        return list(cached[1])
+    
+    result = _original_getaddrinfo(host, port, family, type, proto, flags)
+    _dns_cache[key] = (now, result)
+    return list(result)
+
+
+_yt_dlp = None
+
+
+def _get_ytdlp():
+    """Import yt_dlp on first use; its extractor tree would delay the GUI at startup"""
+    global _yt_dlp
+    if _yt_dlp is None:
+        import yt_dlp
+        _yt_dlp = yt_dlp
+    return _yt_dlp
+
+
+def find_youtube_url(text: str) -> Optional[str]:
+    """First YouTube URL in text, with https:// added when it was typed without a scheme"""
+    match = YOUTUBE_URL_RE.search(text)
+    if not match:
+        return None
+    url = match.group(0)
+    return url if url.startswith(("http://", "https://")) else f"https://{url}"
+
+
+def codec_family(codec: Optional[str]) -> Optional[str]:
+    """Map a yt-dlp vcodec (avc1.64001F, vp09.00.40.08) or FFprobe codec name to one codec name"""
+    if not codec:
+        return None
+    codec = codec.lower()
+    return next((name for prefix, name in CODEC_PREFIXES if codec.startswith(prefix)), codec)
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_id() -> Optional[str]:
+    """
+    Identify the FFmpeg binary on PATH by location, size and mtime, or None
+    when FFmpeg is missing. A stat instead of spawning `ffmpeg -version`;
+    replacing the binary changes the id.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    try:
+        stat = os.stat(ffmpeg)
+    except OSError:
+        return None
+    return f"{ffmpeg}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_encoders() -> frozenset:
+    """Encoder names listed by `ffmpeg -encoders`, empty on failure (once per process)"""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, check=True, **SUBPROCESS_KW)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return frozenset()
+    
+    # Rows after the legend look like " V....D h264_nvenc   NVIDIA NVENC H.264 encoder"
+    _, _, table = result.stdout.partition("------")
+    return frozenset(row.split()[1] for row in table.splitlines() if len(row.split()) >= 2)
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_hwaccels() -> List[str]:
+    """Hardware decoders listed by `ffmpeg -hwaccels` (once per process)"""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-hwaccels"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, check=True, **SUBPROCESS_KW)
+        return result.stdout.split()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+
+
+def normalize_frame_rate(fps: float) -> float:
+    """Round to common frame rates"""
+    if 23 < fps < 25: return 24
+    elif 24 < fps < 26: return 25
+    elif 29 < fps < 31: return 30
+    elif 59 < fps < 61: return 60
+    else: return round(fps)
+
+
+@functools.lru_cache(maxsize=64)
+def _probe_file(video_file: str, mtime: float) -> Dict:
+    """Run FFprobe once per file version; mtime is part of the cache key"""
+    try:
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-show_entries",
+            "stream=codec_type,codec_name,pix_fmt,width,height,r_frame_rate,avg_frame_rate,bit_rate:format=duration",
+            "-of", "json", video_file
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, check=True, **SUBPROCESS_KW)
+        data = json.loads(result.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return dict(PROBE_FALLBACK)
+    
+    probe = dict(PROBE_FALLBACK)
+    streams = data.get('streams') or []
+    stream = next((st for st in streams if st.get('codec_type') == 'video'), {})
+    audio_stream = next((st for st in streams if st.get('codec_type') == 'audio'), {})
+    
+    try:
+        fps_str = stream['r_frame_rate']
+        if '/' in fps_str:
+            num, den = map(int, fps_str.split('/'))
+            fps = num / den
+        else:
+            fps = float(fps_str)
+        
+        probe['fps'] = normalize_frame_rate(fps)
+        # The exact rational (e.g. 30000/1001) for anything that stamps timestamps
+        probe['fps_exact'] = fps_str
+        # VFR sources report an average rate that differs from the base rate
+        probe['is_cfr'] = stream.get('avg_frame_rate') == fps_str
+    except (KeyError, ValueError, ZeroDivisionError):
+        pass  # No video stream, or '0/0'
+    
+    try:
+        probe['duration'] = float(data['format']['duration'])
+    except (KeyError, TypeError, ValueError):
+        pass
+    
+    probe['codec_name'] = stream.get('codec_name')
+    probe['pix_fmt'] = stream.get('pix_fmt')
+    probe['width'] = stream.get('width', 0)
+    probe['height'] = stream.get('height', 0)
+    probe['audio_codec'] = audio_stream.get('codec_name')
+    try:
+        probe['audio_bitrate'] = int(audio_stream.get('bit_rate', 0))
+    except ValueError:
+        pass  # 'N/A'
+    return probe
+
+
+class ProcessError(Exception):
+    """An FFmpeg (or yt-dlp feeder) subprocess exited with an error"""
+
+
+@dataclass
+class JobProgress:
+    """Latest progress of a job, mutated in place by worker threads"""
+    progress: float = 0.0
+    queued: bool = False  # True while the job is waiting in update_queue
 
 
 class VideoJob:
     """Represents a single video download job"""
     def __init__(self, url: str):
         self.url = url
+        self.url_hash = hashlib.blake2b(url.encode(), digest_size=8).hexdigest()  # id fallback, temp names
         self.title = "Fetching info..."
         self.status = "pending"  # pending, downloading, encoding, finished, failed
         self.progress = 0
+        self.last_update = 0.0  # monotonic time of last progress update sent
+        self.last_sent_pct = -1  # whole download percent last sent
+        self.progress_state = JobProgress()
         self.thumbnail = None
         self.video_info = None
         self.video_id = None  # Will be set during fetch or download
@@ -32,17 +355,63 @@ class VideoJob:
         self.status_icon = None
         self.title_label = None
         self.progress_frame = None
+        self.progress_shown = False  # progress_frame packed (once, on first progress)
+        self.last_shown_pct = -1  # whole percent the job's widgets show
         self.progress_bar = None
         self.progress_label = None
+        self.progress_var = None  # DoubleVar behind progress_bar
+        self.progress_text_var = None  # StringVar behind progress_label
 
 
 class DownloaderEngine:
     """Core engine for downloading and processing videos"""
     
-    def __init__(self):
-        self.hw_encoder = self.detect_hardware_encoder()
+    # Capabilities shared by every engine in this process (filled on first load)
+    _CAPS: Optional[Dict] = None
+    
+    # yt-dlp output template for intermediate downloads
+    TEMP_TEMPLATE = "temp_{id}.%(ext)s"
+    
+    def __init__(self, download_concurrency: int = 2, encode_concurrency: Optional[int] = None):
+        socket.getaddrinfo = _cached_getaddrinfo
+        self.load_ffmpeg_caps()
         self.retry_attempts = 2
         
+        # Worker pool sizes (network-bound downloads vs FFmpeg encodes).
+        # One 1080p60 job keeps an NVENC/VideoToolbox ASIC well under half busy,
+        # so two encodes share it. libx264 already threads across cores, so
+        # software encodes only run two at a time on larger machines.
+        if encode_concurrency is None:
+            encode_concurrency = 2 if self.hw_encoder else max(1, min(2, (os.cpu_count() or 2) // 4))
+        self.download_concurrency = download_concurrency
+        self.encode_concurrency = encode_concurrency
+        # Extra diagnostics on errors (costs extra network requests); set YTD_VERBOSE=1
+        self.verbose = os.environ.get("YTD_VERBOSE", "") not in ("", "0")
+        # Let FFmpeg read googlevideo URLs itself instead of going through yt-dlp.
+        # Off by default: FFmpeg fetches with one open-ended request, which YouTube
+        # throttles, while yt-dlp downloads in http_chunk_size ranges.
+        self.stream_urls = False
+        # Encode 4K "H.264 CFR" output as HEVC on the hardware encoder. Opt-in:
+        # not every editor or machine decodes HEVC smoothly.
+        self.hevc_4k = False
+        
+        # Shared state for the worker pools
+        self._completed_lock = threading.Lock()
+        self._output_lock = threading.Lock()
+        self._output_names: Dict[str, str] = {}  # output file name -> URL of the job writing it (this run)
+        self._abort_event = threading.Event()
+        self._cookie_lock = threading.Lock()  # Chrome's cookie DB can't be read concurrently
+        self._cookiejar = None  # Browser cookies, read once and shared by every YoutubeDL
+        
+        # FFprobe runs here so it overlaps with other work instead of blocking the encoder
+        self._probe_pool = ThreadPoolExecutor(max_workers=2)
+        # Metadata fetches are network-bound; run several, but capped
+        self._fetch_pool = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix='info')
+        self._meta_lock = threading.Lock()
+        self._meta_cache = self.load_meta_cache()
+        self._meta_save_timer = None
+        self._meta_write_lock = threading.Lock()
+        
         # Anti-Bot & Cookie Configuration
         self.common_opts = {
             'quiet': True,
@@ -54,62 +423,281 @@ class DownloaderEngine:
             # CRITICAL: Use Browser Cookies
             'cookiesfrombrowser': ('chrome',),
         }
+        
+        # Metadata-only extraction options, fixed for every fetch
+        self.info_opts = {
+            **self.common_opts,
+            # Playlist entries stay as flat stubs - the title only needs the
+            # first entry, not a full extraction of every video in the Mix
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            # CRITICAL: Force Android client - no JavaScript needed!
+            'extractor_args': {
+                'youtube': {
+                    'player_client': ['android'],
+                    'skip': ['hls', 'dash'],
+                }
+            },
+        }
+        
+        # Download tuning
+        self.download_opts = dict(YDL_PERF_OPTS)
+        # Hand transfers to aria2c (multi-connection) when installed. Opt-in:
+        # yt-dlp only reports 'finished' for external downloaders, so the
+        # per-job download bar stays at 0 until the file is complete.
+        self.use_aria2c = False
+        self.aria2c_available = shutil.which("aria2c") is not None
     
     def check_ffmpeg(self) -> bool:
         """Check if FFmpeg is installed"""
-        try:
-            subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        return _ffmpeg_id() is not None
+    
+    def load_ffmpeg_caps(self):
+        """
+        Load encoder/hwaccel capabilities from the on-disk cache.
+        The cache is keyed by the FFmpeg binary's path, size and mtime, so a
+        new FFmpeg build triggers a fresh probe without spawning FFmpeg on
+        a cache hit.
+        """
+        if DownloaderEngine._CAPS is not None:
+            self._apply_caps(DownloaderEngine._CAPS)
+            return
+        
+        ffmpeg_id = _ffmpeg_id()
+        
+        if ffmpeg_id:
+            try:
+                cached = json.loads(CAPS_CACHE_FILE.read_text())
+                if cached.get('ffmpeg_id') == ffmpeg_id and cached.get('version') == CAPS_CACHE_VERSION:
+                    self._apply_caps(cached)
+                    DownloaderEngine._CAPS = cached
+                    return
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        # Cache miss - the FFmpeg queries are independent, so launch them
+        # together instead of paying each process start-up in sequence
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            pool.submit(_ffmpeg_encoders)
+            pool.submit(_ffmpeg_hwaccels)
+            nvenc_future = pool.submit(self.detect_nvenc_caps)
+            scale_future = pool.submit(self.detect_cuda_scale_format)
+        
+        self.hw_encoder = self.detect_hardware_encoder()
+        self.nvenc_caps = nvenc_future.result() if self.hw_encoder == "nvenc" else set()
+        self.hwaccel_flag = self.detect_hwaccel()
+        self.prores_encoder = self.detect_prores_encoder()
+        self.cuda_scale_format = scale_future.result()
+        
+        caps = {
+            'version': CAPS_CACHE_VERSION,
+            'ffmpeg_id': ffmpeg_id,
+            'hw_encoder': self.hw_encoder,
+            'nvenc_caps': sorted(self.nvenc_caps),
+            'hwaccel_flag': self.hwaccel_flag,
+            'prores_encoder': self.prores_encoder,
+            'cuda_scale_format': self.cuda_scale_format,
+        }
+        DownloaderEngine._CAPS = caps
+        
+        if ffmpeg_id:
+            try:
+                CAPS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                CAPS_CACHE_FILE.write_text(json.dumps(caps))
+            except OSError as e:
+                print(f"Could not write capability cache: {e}")
+    
+    def _apply_caps(self, caps: Dict):
+        """Copy a capability dict onto this engine"""
+        self.hw_encoder = caps['hw_encoder']
+        self.nvenc_caps = set(caps['nvenc_caps'])
+        self.hwaccel_flag = caps['hwaccel_flag']
+        self.prores_encoder = caps['prores_encoder']
+        self.cuda_scale_format = caps['cuda_scale_format']
     
     def detect_hardware_encoder(self) -> Optional[str]:
         """Detect available hardware encoder for FFmpeg"""
+        encoders = _ffmpeg_encoders()
+        if "h264_nvenc" in encoders: return "nvenc"
+        if platform.system() == "Darwin" and "h264_videotoolbox" in encoders: return "videotoolbox"
+        if "h264_qsv" in encoders: return "qsv"
+        return None
+    
+    def detect_prores_encoder(self) -> str:
+        """Pick the fastest available ProRes 422 encoder"""
+        encoders = _ffmpeg_encoders()
+        if platform.system() == "Darwin" and "prores_videotoolbox" in encoders: return "prores_videotoolbox"
+        if "prores_aw" in encoders: return "prores_aw"
+        return "prores_ks"
+    
+    def detect_nvenc_caps(self) -> set:
+        """Detect optional h264_nvenc features supported by this FFmpeg build"""
         try:
-            result = subprocess.run(["ffmpeg", "-encoders"], capture_output=True, text=True, check=True)
-            encoders = result.stdout
-            if "h264_nvenc" in encoders: return "nvenc"
-            if platform.system() == "Darwin" and "h264_videotoolbox" in encoders: return "videotoolbox"
-            if "h264_qsv" in encoders: return "qsv"
-            return None
+            result = subprocess.run(["ffmpeg", "-h", "encoder=h264_nvenc"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    text=True, check=True, **SUBPROCESS_KW)
+            help_text = result.stdout
+            caps = set()
+            if "multipass" in help_text: caps.add("multipass")
+            if "temporal_aq" in help_text: caps.add("temporal_aq")
+            # p1..p7 presets and -tune arrived with the NVENC SDK 10 API (FFmpeg 4.3)
+            if "p5" in help_text and "tune" in help_text: caps.add("p_presets")
+            return caps
         except:
+            return set()
+    
+    def detect_cuda_scale_format(self) -> bool:
+        """Check whether scale_cuda takes format= (FFmpeg 5.0+), needed to convert CUDA frames for NVENC"""
+        try:
+            result = subprocess.run(["ffmpeg", "-hide_banner", "-h", "filter=scale_cuda"], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, check=True, **SUBPROCESS_KW)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return False
+        return re.search(r"^\s+format\s", result.stdout, re.MULTILINE) is not None
+    
+    def use_cuda_frames(self, video_codec: Optional[str]) -> bool:
+        """
+        Keep decoded frames in VRAM all the way to NVENC. Needs scale_cuda with
+        format= and a codec NVDEC is sure to decode; otherwise frames are
+        converted in system memory, where scale_cuda can't take them.
+        """
+        return (
+            self.hwaccel_flag == "cuda"
+            and self.cuda_scale_format
+            and codec_family(video_codec) in CUDA_FRAME_CODECS
+        )
+    
+    def detect_hwaccel(self) -> Optional[str]:
+        """Detect the FFmpeg hwaccel (decoder) matching the hardware encoder"""
+        hwaccel_map = {"nvenc": "cuda", "qsv": "qsv", "videotoolbox": "videotoolbox"}
+        wanted = hwaccel_map.get(self.hw_encoder)
+        if not wanted:
             return None
+        return wanted if wanted in _ffmpeg_hwaccels() else None
+    
+    def create_ydl(self, ydl_opts: Dict) -> "yt_dlp.YoutubeDL":
+        """
+        Create a YoutubeDL instance with the shared browser cookie jar.
+        Instances stay per job (their params differ and downloads run in
+        parallel); only the cookie DB read - the slow part - happens once.
+        """
+        ydl = _get_ytdlp().YoutubeDL(ydl_opts)
+        with self._cookie_lock:
+            if self._cookiejar is None:
+                self._cookiejar = ydl.cookiejar  # Lazily reads the browser cookie DB
+            else:
+                # cookiejar is a cached_property, so this replaces the lazy load
+                ydl.cookiejar = self._cookiejar
+        return ydl
+    
+    def export_cookies(self) -> Optional[str]:
+        """
+        Write the shared browser cookies to a private cookie file for a yt-dlp
+        subprocess, so it never reads Chrome's cookie DB outside _cookie_lock.
+        Returns the file path (the caller deletes it), or None without cookies.
+        """
+        with self._cookie_lock:
+            if self._cookiejar is None:
+                return None
+            fd, cookie_file = tempfile.mkstemp(prefix="yt_dlp_pp_cookies_", suffix=".txt")
+            os.close(fd)
+            try:
+                self._cookiejar.save(cookie_file, ignore_discard=True, ignore_expires=True)
+            except Exception:
+                Path(cookie_file).unlink(missing_ok=True)
+                raise
+        return cookie_file
+    
+    def load_meta_cache(self) -> Dict:
+        """Load cached video metadata, dropping entries older than META_CACHE_TTL"""
+        try:
+            cached = json.loads(META_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {url: meta for url, meta in cached.items() if now - meta.get('time', 0) < META_CACHE_TTL}
+    
+    def store_meta(self, job: VideoJob):
+        """Remember a fetched job's id/title/thumbnail on disk"""
+        with self._meta_lock:
+            self._meta_cache[job.url] = {
+                'time': time.time(),
+                'id': job.video_id,
+                'title': job.title,
+                'thumbnail': job.thumbnail,
+            }
+            if self._meta_save_timer is None:
+                self._meta_save_timer = threading.Timer(META_SAVE_DELAY, self.save_meta_cache)
+                self._meta_save_timer.daemon = True
+                self._meta_save_timer.start()
+    
+    def save_meta_cache(self):
+        """Write the metadata cache atomically, so a crash mid-write can't leave a truncated file"""
+        with self._meta_lock:
+            self._meta_save_timer = None
+            data = json.dumps(self._meta_cache)
+        
+        tmp_file = META_CACHE_FILE.with_name(f"{META_CACHE_FILE.name}.{os.getpid()}.tmp")
+        with self._meta_write_lock:
+            try:
+                META_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file.write_text(data)
+                os.replace(tmp_file, META_CACHE_FILE)
+            except OSError as e:
+                print(f"Could not write metadata cache: {e}")
+    
+    def submit_fetch(self, job: VideoJob, update_queue: queue.Queue):
+        """Fetch a job's metadata on the shared fetch pool without waiting"""
+        return self._fetch_pool.submit(self.fetch_video_info, job, update_queue)
+    
+    def shutdown(self):
+        """
+        Drop queued metadata fetches and release the helper pools without
+        waiting. Metadata still waiting for its delayed save is written now.
+        """
+        self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+        self._probe_pool.shutdown(wait=False, cancel_futures=True)
+        
+        with self._meta_lock:
+            timer = self._meta_save_timer
+        if timer is not None:
+            timer.cancel()
+            self.save_meta_cache()
     
     def fetch_video_info(self, job: VideoJob, update_queue: queue.Queue):
         """
         Fetch video metadata using Android client (bypasses JS challenges)
         """
+        cached = self._meta_cache.get(job.url)
+        if cached:
+            job.video_info = cached
+            job.video_id, job.title, job.thumbnail = cached['id'], cached['title'], cached['thumbnail']
+            update_queue.put({'url': job.url, 'title': job.title, 'thumbnail': job.thumbnail})
+            return
+        
         try:
-            ydl_opts = self.common_opts.copy()
-            ydl_opts.update({
-                'extract_flat': False,
-                'skip_download': True,
-                # CRITICAL: Force Android client - no JavaScript needed!
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android'],
-                        'skip': ['hls', 'dash'],
-                    }
-                },
-            })
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Copy: YoutubeDL may adjust the params it is given
+            with self.create_ydl(dict(self.info_opts)) as ydl:
                 info = ydl.extract_info(job.url, download=False)
                 
                 # Handle playlists/mixes
-                if 'entries' in info and info['entries']:
+                entries = info.get('entries')
+                first_entry = next(iter(entries), None) if entries else None
+                if first_entry:
                     # For playlists, show first video info
-                    first_entry = info['entries'][0]
+                    count = info.get('playlist_count') or len(entries)
                     job.video_info = first_entry
-                    job.video_id = first_entry.get('id', hashlib.md5(job.url.encode()).hexdigest()[:8])
-                    job.title = f"Mix: {first_entry.get('title', 'Unknown')} (+{len(info['entries'])-1} more)"
+                    job.video_id = first_entry.get('id') or job.url_hash
+                    job.title = f"Mix: {first_entry.get('title', 'Unknown')} (+{count-1} more)"
                 else:
                     # Single video
                     job.video_info = info
-                    job.video_id = info.get('id', hashlib.md5(job.url.encode()).hexdigest()[:8])
+                    job.video_id = info.get('id') or job.url_hash
                     job.title = info.get('title', 'Unknown Title')
                 
-                job.thumbnail = job.video_info.get('thumbnail')
+                # Flat playlist entries only carry a 'thumbnails' list
+                thumbnails = job.video_info.get('thumbnails') or [{}]
+                job.thumbnail = job.video_info.get('thumbnail') or thumbnails[-1].get('url')
+                self.store_meta(job)
                 
                 update_queue.put({
                     'url': job.url,
@@ -133,23 +721,26 @@ class DownloaderEngine:
                 print(f"\n{'='*60}")
                 print(f"FORMAT ERROR for URL: {job.url}")
                 print(f"{'='*60}")
-                try:
-                    # List available formats for this video
-                    list_opts = {'quiet': True, 'cookiesfrombrowser': ('chrome',)}
-                    with yt_dlp.YoutubeDL(list_opts) as ydl:
-                        info = ydl.extract_info(job.url, download=False)
-                        if 'formats' in info:
-                            print("\nAvailable formats:")
-                            for f in info['formats'][:10]:  # Show first 10
-                                print(f"  - {f.get('format_id', 'N/A')}: {f.get('format_note', 'N/A')} "
-                                      f"{f.get('ext', 'N/A')} {f.get('resolution', 'N/A')}")
-                except:
-                    pass
+                # Listing formats re-extracts the video, a second round-trip for
+                # a request that already failed - only do it when asked to
+                if self.verbose:
+                    try:
+                        # List available formats for this video
+                        list_opts = {'quiet': True, 'cookiesfrombrowser': ('chrome',)}
+                        with self.create_ydl(list_opts) as ydl:
+                            info = ydl.extract_info(job.url, download=False)
+                            if 'formats' in info:
+                                print("\nAvailable formats:")
+                                for f in info['formats'][:10]:  # Show first 10
+                                    print(f"  - {f.get('format_id', 'N/A')}: {f.get('format_note', 'N/A')} "
+                                          f"{f.get('ext', 'N/A')} {f.get('resolution', 'N/A')}")
+                    except:
+                        pass
                 print(f"{'='*60}\n")
                 error_msg = "Format not available. Try 'Pass-through' mode instead."
             
             # Generate fallback ID from URL
-            job.video_id = hashlib.md5(job.url.encode()).hexdigest()[:8]
+            job.video_id = job.url_hash
             
             update_queue.put({
                 'url': job.url,
@@ -157,7 +748,7 @@ class DownloaderEngine:
                 'status': 'failed'
             })
     
-    def progress_hook(self, d: Dict, job: VideoJob, update_queue: queue.Queue):
+    def progress_hook(self, d: Dict, *, job: VideoJob, update_queue: queue.Queue):
         """Hook for yt-dlp progress updates"""
         if d['status'] == 'downloading':
             try:
@@ -165,68 +756,232 @@ class DownloaderEngine:
                 downloaded = d.get('downloaded_bytes', 0)
                 if total > 0:
                     percent = (downloaded / total) * 100
-                    job.progress = percent
-                    update_queue.put({'url': job.url, 'status': 'downloading', 'progress': percent})
+                    
+                    # The progress bar can't show sub-percent steps
+                    pct = int(percent)
+                    if pct == job.last_sent_pct:
+                        return
+                    
+                    # Coalesce per-chunk callbacks into ~10 updates per second
+                    now = time.monotonic()
+                    if now - job.last_update < PROGRESS_UPDATE_INTERVAL and percent < 100:
+                        return
+                    job.last_update = now
+                    job.last_sent_pct = pct
+                    self.publish_progress(job, percent, update_queue)
             except: 
                 pass
         elif d['status'] == 'finished':
-            update_queue.put({'url': job.url, 'progress': 100})
-    
-    def process_queue(self, jobs: List[VideoJob], resolution: str, format_mode: str, output_dir: str, update_queue: queue.Queue):
-        """Process all jobs in queue"""
-        total_jobs = len(jobs)
-        completed = 0
-        
-        for job in jobs:
-            # Skip if fetch failed
-            if job.status == "failed":
-                completed += 1
-                continue
+            self.publish_progress(job, 100, update_queue)
+    
+    def publish_progress(self, job: VideoJob, progress: float, update_queue: queue.Queue):
+        """
+        Store the latest progress on the job and enqueue the job itself.
+        A job is only enqueued once until the UI consumes it, so bursts of
+        updates collapse into a single queue entry.
+        """
+        state = job.progress_state
+        state.progress = progress
+        if not state.queued:
+            state.queued = True
+            update_queue.put(job)
+    
+    def process_queue(self, jobs: List[VideoJob], resolution: str, format_mode: str, output_dir: str, update_queue: queue.Queue,
+                      encode_speed: str = "balanced"):
+        """
+        Process all jobs in queue.
+        Downloads run on one pool and FFmpeg encodes on another, so the
+        download of the next job overlaps with the encode of the previous one.
+        """
+        self._total_jobs = len(jobs)
+        self._completed = 0
+        self._output_names = {}
+        output_path = Path(output_dir)
+        self._abort_event.clear()
+        
+        with ThreadPoolExecutor(max_workers=self.download_concurrency) as download_pool, \
+                ThreadPoolExecutor(max_workers=self.encode_concurrency) as encode_pool:
+            download_futures = {}
+            for job in jobs:
+                # Skip if fetch failed
+                if job.status == "failed":
+                    self._mark_completed()
+                    continue
+                
+                future = download_pool.submit(self._download_job, job, resolution, format_mode,
+                                              output_path, update_queue)
+                download_futures[future] = job
             
-            success = False
-            for attempt in range(self.retry_attempts):
-                try:
-                    if format_mode == "passthrough":
-                        success = self.download_passthrough(job, resolution, output_dir, update_queue)
-                    elif format_mode == "prores":
-                        success = self.download_and_transcode_prores(job, resolution, output_dir, update_queue)
-                    elif format_mode == "h264_cfr":
-                        success = self.download_and_transcode_h264_cfr(job, resolution, output_dir, update_queue)
-                    
-                    if success: 
-                        break
-                        
-                except Exception as e:
-                    error_str = str(e)
-                    print(f"Download Attempt {attempt+1} Error: {error_str}")
+            batch = []
+            batch_limit = self.batch_size_limit()
+            pending = set(download_futures)
+            while pending:
+                # Ready clips don't wait on downloads that are slow or backing off for a retry
+                done, pending = wait(pending, timeout=BATCH_FLUSH_SECONDS if batch else None,
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    self._submit_batch(encode_pool, batch, resolution, output_path, update_queue, encode_speed)
+                    batch = []
+                    continue
+                
+                for future in done:
+                    job = download_futures[future]
+                    source = future.result()
                     
-                    # Check for browser lock
-                    if "cookie" in error_str.lower() and "locked" in error_str.lower():
+                    if source is None:
+                        self._report_job_result(job, False, update_queue)
+                    elif format_mode == "passthrough":
+                        self._report_job_result(job, True, update_queue)
+                    elif source.get('batchable'):
+                        batch.append((job, source))
+                        if len(batch) == batch_limit:
+                            self._submit_batch(encode_pool, batch, resolution, output_path, update_queue, encode_speed)
+                            batch = []
+                    else:
+                        self._submit_encode(encode_pool, job, source, resolution, format_mode, output_path,
+                                            update_queue, encode_speed)
+            
+            if batch:
+                self._submit_batch(encode_pool, batch, resolution, output_path, update_queue, encode_speed)
+        
+        update_queue.put({'all_complete': True})
+    
+    def _download_job(self, job: VideoJob, resolution: str, format_mode: str, output_path: Path,
+                      update_queue: queue.Queue) -> Optional[Dict]:
+        """
+        Download worker: fetch the source and decide whether it can join a
+        batch. That may wait on the file's probe, so it happens here rather
+        than on the dispatching thread.
+        """
+        source = self._run_with_retries(self._download_stage, job, update_queue,
+                                        job, resolution, format_mode, output_path, update_queue)
+        if source is not None and format_mode == "h264_cfr":
+            source['batchable'] = self._is_batchable(source, resolution)
+        return source
+    
+    def _submit_encode(self, encode_pool: ThreadPoolExecutor, job: VideoJob, source: Dict, resolution: str,
+                       format_mode: str, output_path: Path, update_queue: queue.Queue, encode_speed: str):
+        """Queue a single-job encode and report its result when done"""
+        encode_future = encode_pool.submit(
+            self._run_with_retries, self._encode_stage,
+            job, update_queue, job, source, resolution, format_mode, output_path, update_queue, encode_speed,
+            attempts=self._encode_attempts(source)
+        )
+        encode_future.add_done_callback(
+            lambda f: self._report_job_result(job, f.result() is not None, update_queue)
+        )
+    
+    def _submit_batch(self, encode_pool: ThreadPoolExecutor, batch: List[Tuple[VideoJob, Dict]], resolution: str,
+                      output_path: Path, update_queue: queue.Queue, encode_speed: str):
+        """Queue a batch of short clips as one FFmpeg encode"""
+        if len(batch) == 1:
+            job, source = batch[0]
+            self._submit_encode(encode_pool, job, source, resolution, "h264_cfr", output_path,
+                                update_queue, encode_speed)
+            return
+        
+        encode_future = encode_pool.submit(self._batch_encode_stage, batch, resolution, output_path,
+                                           update_queue, encode_speed)
+        encode_future.add_done_callback(
+            lambda f: [self._report_job_result(job, success, update_queue)
+                       for (job, _), success in zip(batch, f.result())]
+        )
+    
+    def _encode_attempts(self, source: Dict) -> int:
+        """
+        A local file re-encodes the same way every time; a source read over
+        the network (URLs or the yt-dlp pipe) can drop midway and deserves a retry
+        """
+        return self.retry_attempts if source['pipe_command'] or not source['is_temp'] else 1
+    
+    def batch_size_limit(self) -> int:
+        """
+        Clips per batch. On NVENC each clip is a separate encoder session (and
+        CUDA decoder), so a full batch in every encode slot must stay within
+        NVENC_MAX_SESSIONS.
+        """
+        if self.hw_encoder != "nvenc":
+            return BATCH_MAX_JOBS
+        return max(1, min(BATCH_MAX_JOBS, NVENC_MAX_SESSIONS // max(1, self.encode_concurrency)))
+    
+    def _is_batchable(self, source: Dict, resolution: str) -> bool:
+        """Short clips on a hardware encoder can share one FFmpeg process"""
+        if not self.hw_encoder or source['pipe_command'] or not 0 < (source['duration'] or 0) < SHORT_CLIP_SECONDS:
+            return False
+        # Downloads that only need a remux take the cheaper single-job route
+        return not source['is_temp'] or not self.is_edit_ready_h264(source['probe'].result(), resolution)
+    
+    def _run_with_retries(self, stage, job: VideoJob, update_queue: queue.Queue, *args, attempts: Optional[int] = None):
+        """
+        Run a pipeline stage, retrying transient errors with exponential backoff.
+        attempts defaults to retry_attempts. Returns the stage result, or None on failure.
+        """
+        attempts = attempts or self.retry_attempts
+        for attempt in range(attempts):
+            if self._abort_event.is_set():
+                return None
+            
+            try:
+                return stage(*args)
+                
+            except Exception as e:
+                error_str = str(e)
+                print(f"{stage.__name__} Attempt {attempt+1} Error: {error_str}")
+                
+                # Check for browser lock
+                if "cookie" in error_str.lower() and "locked" in error_str.lower():
+                    if not self._abort_event.is_set():
+                        self._abort_event.set()  # Stop processing remaining jobs
                         update_queue.put({
                             'url': job.url, 
                             'status': 'failed', 
                             'error': "ERROR: Chrome browser is open! Close it completely and try again."
                         })
-                        return  # Stop processing
-                    
-                    if attempt == self.retry_attempts - 1:
-                        update_queue.put({
-                            'url': job.url, 
-                            'status': 'failed', 
-                            'error': f"Failed: {error_str[:100]}"
-                        })
-            
-            if success:
-                completed += 1
-                update_queue.put({
-                    'url': job.url, 
-                    'status': 'finished', 
-                    'total_progress': (completed / total_jobs) * 100
-                })
-            else:
-                update_queue.put({'url': job.url, 'status': 'failed'})
-        
-        update_queue.put({'all_complete': True})
+                    return None
+                
+                if attempt == attempts - 1 or not self.is_transient_error(e):
+                    update_queue.put({
+                        'url': job.url, 
+                        'status': 'failed', 
+                        'error': f"Failed: {error_str[:100]}"
+                    })
+                    return None
+                
+                time.sleep(2 ** attempt)
+        return None
+    
+    def is_transient_error(self, e: Exception) -> bool:
+        """
+        Check whether retrying might help. yt-dlp wraps permanent failures
+        (private or removed videos, a full disk) in DownloadError as well, so
+        those are told apart by message and by the original exception.
+        """
+        from yt_dlp.utils import DownloadError
+        if isinstance(e, (ProcessError, *TRANSIENT_ERRORS)):
+            return True
+        if not isinstance(e, DownloadError):
+            return False
+        if any(marker in str(e).lower() for marker in PERMANENT_ERROR_MARKERS):
+            return False
+        cause = e.exc_info[1] if e.exc_info else None
+        return not (isinstance(cause, OSError) and cause.errno in PERMANENT_ERRNOS)
+    
+    def _mark_completed(self) -> float:
+        """Increment the completed counter and return total progress percent"""
+        with self._completed_lock:
+            self._completed += 1
+            return (self._completed / self._total_jobs) * 100
+    
+    def _report_job_result(self, job: VideoJob, success: bool, update_queue: queue.Queue):
+        """Send the final status of a job to the UI"""
+        if success:
+            update_queue.put({
+                'url': job.url, 
+                'status': 'finished', 
+                'total_progress': self._mark_completed()
+            })
+        else:
+            update_queue.put({'url': job.url, 'status': 'failed'})
     
     def get_format_string(self, resolution: str) -> str:
         """
@@ -237,33 +992,46 @@ class DownloaderEngine:
         # The Android client extractor will provide the formats
         return "best"
 
-    def download_passthrough(self, job: VideoJob, resolution: str, output_dir: str, update_queue: queue.Queue) -> bool:
+    def build_download_opts(self, job: VideoJob, resolution: str, format_mode: str, output_path: Path,
+                            update_queue: queue.Queue) -> Dict:
+        """Build yt-dlp options for a job from its DOWNLOAD_MODES entry"""
+        mode = DOWNLOAD_MODES[format_mode]
+        if mode['template']:
+            outtmpl = output_path / mode['template']
+        else:
+            # Name temp files by URL hash: Mix URLs can share the first video's
+            # id, and a stable name lets yt-dlp resume a leftover .part file
+            outtmpl = TEMP_DIR / self.TEMP_TEMPLATE.format(id=job.url_hash)
+        
+        ydl_opts = {**self.common_opts, **self.download_opts}
+        if self.use_aria2c and self.aria2c_available:
+            # yt-dlp's Aria2cFD already picks the connection/allocation flags
+            ydl_opts['external_downloader'] = {'default': 'aria2c'}
+        ydl_opts.update({
+            'format': self.get_format_string(resolution),
+            'outtmpl': str(outtmpl),
+            'merge_output_format': mode['merge'],
+            'postprocessors': list(mode['postprocessors']),
+            'progress_hooks': [functools.partial(self.progress_hook, job=job, update_queue=update_queue)],
+            # progress_hook feeds the UI; yt-dlp's console log and progress bar are pure overhead
+            'noprogress': True,
+        })
+        if mode['android_client']:
+            ydl_opts['extractor_args'] = {
+                'youtube': {
+                    'player_client': ['android'],
+                    'skip': ['hls', 'dash'],
+                }
+            }
+        return ydl_opts
+    
+    def download_passthrough(self, job: VideoJob, resolution: str, output_path: Path, update_queue: queue.Queue) -> bool:
         """Download without re-encoding using Android client"""
         try:
-            safe_id = job.video_id or hashlib.md5(job.url.encode()).hexdigest()[:8]
-            output_template = os.path.join(output_dir, '%(title)s.%(ext)s')
-            
-            ydl_opts = self.common_opts.copy()
-            ydl_opts.update({
-                'format': self.get_format_string(resolution),
-                'outtmpl': output_template,
-                'merge_output_format': 'mp4',
-                'postprocessors': [{'key': 'FFmpegMetadata', 'add_metadata': True}],
-                'progress_hooks': [lambda d: self.progress_hook(d, job, update_queue)],
-                'quiet': False,
-                'no_warnings': False,
-                # Use Android client for download too
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android'],
-                        'skip': ['hls', 'dash'],
-                    }
-                },
-            })
-            
+            ydl_opts = self.build_download_opts(job, resolution, "passthrough", output_path, update_queue)
             update_queue.put({'url': job.url, 'status': 'downloading'})
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self.create_ydl(ydl_opts) as ydl:
                 ydl.download([job.url])
             
             return True
@@ -272,196 +1040,661 @@ class DownloaderEngine:
             print(f"Passthrough Error: {e}")
             raise e
     
-    def download_and_transcode_h264_cfr(self, job: VideoJob, resolution: str, output_dir: str, update_queue: queue.Queue) -> bool:
-        """Download and transcode to H.264 CFR"""
+    def _download_stage(self, job: VideoJob, resolution: str, format_mode: str, output_path: Path, update_queue: queue.Queue) -> Dict:
+        """
+        Download stage: resolve the source the encode stage will read from.
+        Returns a source dict with 'video', 'audio', 'http_headers', 'fps',
+        'duration', 'pipe_command' and 'is_temp' keys (plus a 'probe' future
+        for temp files).
+        """
+        if format_mode == "passthrough":
+            self.download_passthrough(job, resolution, output_path, update_queue)
+            return {}
+        
         try:
-            # Use video_id for temp file
-            safe_id = job.video_id or hashlib.md5(job.url.encode()).hexdigest()[:8]
-            temp_file = os.path.join(output_dir, f"temp_{safe_id}.%(ext)s")
-            
-            ydl_opts = self.common_opts.copy()
-            ydl_opts.update({
-                'format': self.get_format_string(resolution),
-                'outtmpl': temp_file,
-                'merge_output_format': 'mkv',
-                'progress_hooks': [lambda d: self.progress_hook(d, job, update_queue)],
-                'quiet': False
-            })
-            
+            ydl_opts = self.build_download_opts(job, resolution, format_mode, output_path, update_queue)
             update_queue.put({'url': job.url, 'status': 'downloading'})
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(job.url, download=True)
+            with self.create_ydl(ydl_opts) as ydl:
+                info = ydl.extract_info(job.url, download=False)
+                source = self._source_from_info(info)
+                if self.stream_urls and self._is_streamable(info):
+                    return source
+                
+                # ProRes and HEVC 10-bit always re-encode, so pipe yt-dlp's
+                # (chunked) download straight into FFmpeg instead of a temp MKV
+                if format_mode in ("prores", "hevc10"):
+                    source.update({
+                        'video': 'pipe:0',
+                        'audio': None,
+                        'http_headers': None,
+                        'pipe_command': self.build_ytdlp_pipe_command(job.url, info, ydl_opts),
+                    })
+                    return source
+                
+                # H.264 CFR: download first so the remux check can inspect the file
+                info = ydl.process_ie_result(info, download=True)
                 downloaded_file = ydl.prepare_filename(info)
+                return {
+                    **source,
+                    'video': downloaded_file,
+                    'audio': None,
+                    'http_headers': None,
+                    'is_temp': True,
+                    # Probe in the background while the job waits for an encode slot
+                    'probe': self._probe_pool.submit(self.probe_video, downloaded_file),
+                }
             
-            # Transcode
+        except Exception as e:
+            print(f"Download Error: {e}")
+            raise e
+    
+    def _is_streamable(self, info: Dict) -> bool:
+        """Check whether FFmpeg can read every selected format directly over HTTP"""
+        formats = info.get('requested_formats') or [info]
+        return all(f.get('url') and f.get('protocol') in ('http', 'https') for f in formats)
+    
+    def _source_from_info(self, info: Dict) -> Dict:
+        """Build a URL source dict from yt-dlp info"""
+        formats = info.get('requested_formats') or [info]
+        video_fmt = next((f for f in formats if f.get('vcodec') != 'none'), formats[0])
+        audio_fmt = next((f for f in formats if f is not video_fmt and f.get('acodec') != 'none'), None)
+        
+        return {
+            'video': video_fmt['url'],
+            'audio': audio_fmt['url'] if audio_fmt else None,
+            'http_headers': video_fmt.get('http_headers') or info.get('http_headers'),
+            'fps': video_fmt.get('fps') or info.get('fps'),
+            'video_codec': video_fmt.get('vcodec') or info.get('vcodec'),
+            'duration': info.get('duration'),
+            'audio_codec': 'aac' if ((audio_fmt or video_fmt).get('acodec') or '').startswith('mp4a') else None,
+            'audio_bitrate': int(((audio_fmt or video_fmt).get('abr') or 0) * 1000),
+            'pipe_command': None,
+            'is_temp': False,
+        }
+    
+    def build_ytdlp_pipe_command(self, url: str, info: Dict, ydl_opts: Dict) -> List[str]:
+        """Build a yt-dlp command line that writes the selected formats to stdout"""
+        cmd = [
+            sys.executable, "-m", "yt_dlp", "--quiet", "--no-warnings",
+            "-f", info.get('format_id') or ydl_opts['format'],
+            "--merge-output-format", "mkv", "-o", "-",
+            # Same chunked, retried transfer as in-process downloads (YDL_PERF_OPTS)
+            "--http-chunk-size", str(ydl_opts['http_chunk_size']),
+            "--retries", str(ydl_opts['retries']),
+            "--fragment-retries", str(ydl_opts['fragment_retries']),
+        ]
+        # Cookies are added per run by run_piped_ffmpeg from the shared jar
+        youtube_args = ydl_opts.get('extractor_args', {}).get('youtube')
+        if youtube_args:
+            cmd.extend(["--extractor-args", "youtube:" + ";".join(
+                f"{key}={','.join(values)}" for key, values in youtube_args.items()
+            )])
+        cmd.append(url)
+        return cmd
+    
+    def _encode_stage(self, job: VideoJob, source: Dict, resolution: str, format_mode: str, output_path: Path, update_queue: queue.Queue,
+                      encode_speed: str = "balanced") -> str:
+        """Encode stage: transcode the source (temp file, direct URLs or yt-dlp pipe) and return the output path"""
+        try:
             update_queue.put({'url': job.url, 'status': 'encoding', 'progress': 0})
             
-            safe_title = self.sanitize_filename(job.title)
-            output_file = os.path.join(output_dir, f"{safe_title}_CFR.mp4")
+            # Stream parameters from the yt-dlp info dict
+            fps = self.normalize_frame_rate(source['fps']) if source['fps'] else 30
+            duration = source['duration'] or 0
+            audio_codec, audio_bitrate = source['audio_codec'], source['audio_bitrate']
+            video_codec = source.get('video_codec')
             
-            fps = self.detect_frame_rate(downloaded_file)
-            ffmpeg_cmd = self.build_h264_cfr_command(downloaded_file, output_file, fps)
+            # Temp files are probed as well; the container's values win when FFprobe succeeded
+            probe = None
+            if source['is_temp']:
+                probe = source['probe'].result()
+                if probe['codec_name']:
+                    fps, duration = probe['fps'], probe['duration'] or duration
+                    audio_codec, audio_bitrate = probe['audio_codec'], probe['audio_bitrate']
+                    video_codec = probe['codec_name']
             
-            self.run_ffmpeg_with_progress(
-                ffmpeg_cmd, job, update_queue, 
-                self.get_video_duration(downloaded_file)
-            )
+            codec = self.select_output_codec(resolution)
+            edit_ready = format_mode == "h264_cfr" and probe and self.is_edit_ready_h264(probe, resolution)
+            if edit_ready:
+                # Already CFR H.264 at the requested size - remux only
+                output_file = self.reserve_output_file(job, output_path, "_CFR.mp4")
+                ffmpeg_cmd = self.build_remux_command(source['video'], output_file, audio_codec, audio_bitrate)
+            elif format_mode == "prores":
+                output_file = self.reserve_output_file(job, output_path, "_ProRes.mov")
+                ffmpeg_cmd = self.build_prores_command(source['video'], output_file, fps,
+                                                       source['audio'], source['http_headers'])
+            elif format_mode == "hevc10":
+                output_file = self.reserve_output_file(job, output_path, "_HEVC10.mov")
+                ffmpeg_cmd = self.build_hevc10_command(source['video'], output_file, fps,
+                                                       source['audio'], source['http_headers'], video_codec)
+            else:
+                output_file = self.reserve_output_file(job, output_path, CFR_SUFFIXES[codec])
+                ffmpeg_cmd = self.build_h264_cfr_command(source['video'], output_file, fps,
+                                                         source['audio'], source['http_headers'],
+                                                         encode_speed, audio_codec, audio_bitrate, codec,
+                                                         video_codec)
+            
+            if format_mode == "h264_cfr" and probe and not edit_ready and self.can_transcode_nvc(probe):
+                # Already CFR, so NVDEC -> NVENC needs no frame rate conversion
+                try:
+                    self._transcode_nvc(job, source['video'], output_file, probe, encode_speed,
+                                        audio_codec, audio_bitrate, update_queue, codec)
+                    Path(source['video']).unlink(missing_ok=True)
+                    return output_file
+                except Exception as e:
+                    print(f"PyNvVideoCodec Error, falling back to FFmpeg: {e}")
+            
+            if source['pipe_command']:
+                self.run_piped_ffmpeg(ffmpeg_cmd, source['pipe_command'], job, update_queue, duration)
+            else:
+                self.run_ffmpeg_with_progress(ffmpeg_cmd, job, update_queue, duration)
             
             # Cleanup
-            if os.path.exists(downloaded_file):
-                os.remove(downloaded_file)
+            if source['is_temp']:
+                Path(source['video']).unlink(missing_ok=True)
             
-            return True
+            return output_file
             
         except Exception as e:
-            print(f"CFR Error: {e}")
+            print(f"Encode Error: {e}")
             raise e
 
-    def download_and_transcode_prores(self, job: VideoJob, resolution: str, output_dir: str, update_queue: queue.Queue) -> bool:
-        """Download and transcode to ProRes 422 using Android client"""
+    def reserve_output_file(self, job: VideoJob, output_path: Path, suffix: str) -> str:
+        """
+        Pick the job's output path. Encodes run in parallel, so a title already
+        claimed by another job of this run (same video under two URLs, or two
+        videos with one title) gets a " (2)", " (3)"... counter. A job asking
+        again, e.g. on retry, gets its own name back.
+        """
+        base = self.sanitize_filename(job.title)
+        name = f"{base}{suffix}"
+        with self._output_lock:
+            counter = 2
+            # Casefolded: Windows and macOS filesystems ignore case
+            while self._output_names.get(name.casefold(), job.url) != job.url:
+                name = f"{base} ({counter}){suffix}"
+                counter += 1
+            self._output_names[name.casefold()] = job.url
+        return str(output_path / name)
+    
+    def can_encode_hevc(self) -> bool:
+        """
+        HEVC output needs a hardware encoder: libx265 is far slower than
+        libx264, so CPU encodes stay H.264.
+        """
+        return bool(self.hw_encoder) and f"hevc_{self.hw_encoder}" in _ffmpeg_encoders()
+    
+    def select_output_codec(self, resolution: str) -> str:
+        """
+        Use HEVC for 4K when the user opted in (hevc_4k) and the hardware
+        encoder supports it: faster on NVENC and about half the bitrate of
+        H.264 at equal quality. Otherwise the chosen H.264 is kept.
+        """
+        if self.hevc_4k and "4K" in resolution and self.can_encode_hevc():
+            return "hevc"
+        return "h264"
+    
+    def can_transcode_nvc(self, probe: Dict) -> bool:
+        """Check whether a probed local file can go through PyNvVideoCodec"""
+        return (
+            nvc is not None
+            and self.hw_encoder == "nvenc"
+            and probe['is_cfr']
+            and probe['fps_exact']
+            and probe['width'] > 0 and probe['height'] > 0
+        )
+    
+    def _transcode_nvc(self, job: VideoJob, input_file: str, output_file: str, probe: Dict, encode_speed: str,
+                       audio_codec: Optional[str], audio_bitrate: int, update_queue: queue.Queue,
+                       codec: str = "h264"):
+        """Transcode video with PyNvVideoCodec, then mux the source audio with FFmpeg"""
+        preset, _, _, _ = NVENC_SPEED_PRESETS.get(encode_speed, NVENC_SPEED_PRESETS['balanced'])
+        # Not the normalized fps: stamping a 29.97 source as 30 plays it 0.1%
+        # fast and drifts against the copied audio (~3.6 s per hour)
+        fps = probe['fps_exact']
+        num, _, den = fps.partition('/')
+        total_frames = max(int(num) / int(den or 1) * probe['duration'], 1)
+        
+        with tempfile.NamedTemporaryFile(suffix=f".{codec}", delete=False) as elementary:
+            video_stream = elementary.name
+            try:
+                demuxer = nvc.CreateDemuxer(filename=input_file)
+                decoder = nvc.CreateDecoder(gpuid=0, codec=demuxer.GetNvCodecId(), cudacontext=0, cudastream=0,
+                                            usedevicememory=True)
+                encoder = nvc.CreateEncoder(probe['width'], probe['height'], "NV12", False,
+                                            codec=codec, preset=preset.upper(), rc="vbr", fps=fps)
+                
+                frames = 0
+                for packet in demuxer:
+                    for frame in decoder.Decode(packet):
+                        elementary.write(encoder.Encode(frame))
+                        frames += 1
+                        now = time.monotonic()
+                        if now - job.last_update >= PROGRESS_UPDATE_INTERVAL:
+                            job.last_update = now
+                            self.publish_progress(job, min(frames * 100.0 / total_frames, 99), update_queue)
+                elementary.write(encoder.EndEncode())
+            except Exception:
+                elementary.close()
+                Path(video_stream).unlink(missing_ok=True)
+                raise
+        
         try:
-            safe_id = job.video_id or hashlib.md5(job.url.encode()).hexdigest()[:8]
-            temp_file = os.path.join(output_dir, f"temp_{safe_id}.%(ext)s")
-            
-            ydl_opts = self.common_opts.copy()
-            ydl_opts.update({
-                'format': self.get_format_string(resolution),
-                'outtmpl': temp_file,
-                'merge_output_format': 'mkv',
-                'progress_hooks': [lambda d: self.progress_hook(d, job, update_queue)],
-                'quiet': False,
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android'],
-                        'skip': ['hls', 'dash'],
-                    }
-                },
-            })
-            
-            update_queue.put({'url': job.url, 'status': 'downloading'})
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(job.url, download=True)
-                downloaded_file = ydl.prepare_filename(info)
-            
-            # Transcode
-            update_queue.put({'url': job.url, 'status': 'encoding', 'progress': 0})
-            
-            safe_title = self.sanitize_filename(job.title)
-            output_file = os.path.join(output_dir, f"{safe_title}_ProRes.mov")
-            
-            fps = self.detect_frame_rate(downloaded_file)
-            ffmpeg_cmd = self.build_prores_command(downloaded_file, output_file, fps)
-            
-            self.run_ffmpeg_with_progress(
-                ffmpeg_cmd, job, update_queue, 
-                self.get_video_duration(downloaded_file)
-            )
+            # Raw H.264/HEVC carries no timestamps; -framerate stamps it CFR
+            mux_cmd = [
+                "ffmpeg", "-framerate", fps, "-i", video_stream, "-i", input_file,
+                "-map", "0:v:0", "-map", "1:a:0?", "-c:v", "copy",
+                *(["-tag:v", "hvc1"] if codec == "hevc" else []),
+                *self.build_audio_args(audio_codec, audio_bitrate),
+                "-movflags", "+faststart", "-loglevel", "error", "-y", output_file
+            ]
+            result = subprocess.run(mux_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                                    **SUBPROCESS_KW)
+            if result.returncode != 0:
+                raise ProcessError(f"FFmpeg mux failed: {result.stderr.strip()[-200:]}")
+        finally:
+            Path(video_stream).unlink(missing_ok=True)
+
+    def _batch_encode_stage(self, batch: List[Tuple[VideoJob, Dict]], resolution: str, output_path: Path,
+                            update_queue: queue.Queue, encode_speed: str = "balanced") -> List[bool]:
+        """
+        Encode several short clips to H.264 CFR in one FFmpeg process.
+        Returns a success flag per clip.
+        """
+        jobs = [job for job, _ in batch]
+        if self._abort_event.is_set():
+            return [False] * len(batch)
+        
+        try:
+            codec = self.select_output_codec(resolution)
+            items = []
+            for job, source in batch:
+                update_queue.put({'url': job.url, 'status': 'encoding', 'progress': 0})
+                fps = self.normalize_frame_rate(source['fps']) if source['fps'] else 30
+                if source['is_temp']:
+                    # The container's values win when FFprobe succeeded
+                    probe = source['probe'].result()
+                    if probe['codec_name']:
+                        fps = probe['fps']
+                        source = {**source, 'audio_codec': probe['audio_codec'], 'audio_bitrate': probe['audio_bitrate'],
+                                  'video_codec': probe['codec_name']}
+                output_file = self.reserve_output_file(job, output_path, CFR_SUFFIXES[codec])
+                items.append((source, output_file, fps))
             
-            # Cleanup
-            if os.path.exists(downloaded_file):
-                os.remove(downloaded_file)
+            ffmpeg_cmd = self.build_h264_batch_command(items, encode_speed, codec)
+            # FFmpeg reports the furthest output position, so track the longest clip
+            duration = max(source['duration'] for _, source in batch)
+            self.run_ffmpeg_with_progress(ffmpeg_cmd, jobs[0], update_queue, duration, batch_jobs=jobs)
             
-            return True
+            for source, _, _ in items:
+                if source['is_temp']:
+                    Path(source['video']).unlink(missing_ok=True)
+            return [True] * len(batch)
             
         except Exception as e:
-            print(f"ProRes Error: {e}")
-            raise e
+            # One bad clip (e.g. a dead URL) fails the whole command; encode the
+            # clips one by one in this slot so only that clip fails, with retries
+            print(f"Batch Encode Error, encoding clips separately: {e}")
+            return [
+                self._run_with_retries(self._encode_stage, job, update_queue, job, source, resolution, "h264_cfr",
+                                       output_path, update_queue, encode_speed,
+                                       attempts=self._encode_attempts(source)) is not None
+                for job, source in batch
+            ]
 
-    def build_h264_cfr_command(self, input_file: str, output_file: str, fps: float) -> List[str]:
-        """Build FFmpeg command for H.264 CFR encoding"""
-        cmd = ["ffmpeg", "-i", input_file]
+    def download_and_transcode_h264_cfr(self, job: VideoJob, resolution: str, output_dir: str, update_queue: queue.Queue,
+                                        encode_speed: str = "balanced") -> bool:
+        """Download and transcode to H.264 CFR"""
+        output_path = Path(output_dir)
+        source = self._download_stage(job, resolution, "h264_cfr", output_path, update_queue)
+        self._encode_stage(job, source, resolution, "h264_cfr", output_path, update_queue, encode_speed)
+        return True
+
+    def download_and_transcode_prores(self, job: VideoJob, resolution: str, output_dir: str, update_queue: queue.Queue) -> bool:
+        """Download and transcode to ProRes 422 using Android client"""
+        output_path = Path(output_dir)
+        source = self._download_stage(job, resolution, "prores", output_path, update_queue)
+        self._encode_stage(job, source, resolution, "prores", output_path, update_queue)
+        return True
+
+    def encoder_threads(self) -> int:
+        """Threads per software encode, so parallel encodes don't oversubscribe the CPU"""
+        return max(2, (os.cpu_count() or 2) // max(1, self.encode_concurrency))
+    
+    def build_single_input_args(self, source: str, http_headers: Optional[Dict] = None) -> List[str]:
+        """Build FFmpeg arguments for one input (local file, pipe or URL)"""
+        args = []
+        if source.startswith(("http://", "https://")):
+            args.extend(["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"])
+            if http_headers:
+                args.extend(["-headers", "".join(f"{k}: {v}\r\n" for k, v in http_headers.items())])
+        args.extend(["-i", source])
+        return args
+    
+    def build_input_args(self, input_file: str, audio_file: Optional[str] = None,
+                         http_headers: Optional[Dict] = None) -> List[str]:
+        """Build FFmpeg input arguments for a local file or direct video/audio URLs"""
+        args = self.build_single_input_args(input_file, http_headers)
+        
+        # Separate audio input - map video from the first, audio from the second
+        if audio_file:
+            args.extend(self.build_single_input_args(audio_file, http_headers))
+            args.extend(["-map", "0:v:0", "-map", "1:a:0"])
+        return args
+    
+    def build_hw_device_args(self) -> List[str]:
+        """Global hardware device options (once per FFmpeg command)"""
+        if self.hwaccel_flag == "qsv":
+            return ["-init_hw_device", "qsv=hw", "-filter_hw_device", "hw"]
+        return []
+    
+    def build_hw_decode_args(self, video_codec: Optional[str] = None) -> List[str]:
+        """Per-input hardware decode options (placed before the video -i)"""
+        if self.hwaccel_flag == "cuda":
+            if not self.use_cuda_frames(video_codec):
+                return ["-hwaccel", "cuda"]  # Decoded frames are copied back to system memory
+            return ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda",
+                    "-extra_hw_frames", str(NVENC_LOOKAHEAD)]
+        elif self.hwaccel_flag == "qsv":
+            return ["-hwaccel", "qsv", "-hwaccel_output_format", "qsv"]
+        elif self.hwaccel_flag == "videotoolbox":
+            return ["-hwaccel", "videotoolbox"]
+        return []
+    
+    def build_h264_cfr_command(self, input_file: str, output_file: str, fps: float,
+                               audio_file: Optional[str] = None, http_headers: Optional[Dict] = None,
+                               encode_speed: str = "balanced", audio_codec: Optional[str] = None,
+                               audio_bitrate: int = 0, codec: str = "h264",
+                               video_codec: Optional[str] = None) -> List[str]:
+        """Build FFmpeg command for H.264 (or HEVC) CFR encoding"""
+        cmd = ["ffmpeg", *self.build_hw_device_args(), *self.build_hw_decode_args(video_codec)]
+        cmd.extend(self.build_input_args(input_file, audio_file, http_headers))
+        cmd.extend(self.build_h264_video_args(fps, encode_speed, codec, video_codec))
+        cmd.extend(self.build_audio_args(audio_codec, audio_bitrate))
+        cmd.extend([
+            "-movflags", "+faststart", 
+            *FFMPEG_PROGRESS_ARGS,
+            "-y", output_file
+        ])
+        return cmd
+    
+    def build_h264_batch_command(self, items: List[Tuple[Dict, str, float]], encode_speed: str = "balanced",
+                                 codec: str = "h264") -> List[str]:
+        """Build one FFmpeg command encoding several (source, output_file, fps) items"""
+        cmd = ["ffmpeg", *FFMPEG_PROGRESS_ARGS, "-y", *self.build_hw_device_args()]
+        outputs = []
+        index = 0
+        
+        for source, output_file, fps in items:
+            cmd.extend(self.build_hw_decode_args(source.get('video_codec')))
+            cmd.extend(self.build_single_input_args(source['video'], source['http_headers']))
+            maps = ["-map", f"{index}:v:0"]
+            if source['audio']:
+                cmd.extend(self.build_single_input_args(source['audio'], source['http_headers']))
+                index += 1
+                maps.extend(["-map", f"{index}:a:0"])
+            else:
+                maps.extend(["-map", f"{index}:a:0?"])
+            index += 1
+            
+            outputs.extend(maps)
+            outputs.extend(self.build_h264_video_args(fps, encode_speed, codec, source.get('video_codec')))
+            outputs.extend(self.build_audio_args(source['audio_codec'], source['audio_bitrate']))
+            outputs.extend(["-movflags", "+faststart", output_file])
+        
+        return cmd + outputs
+    
+    def build_h264_video_args(self, fps: float, encode_speed: str = "balanced", codec: str = "h264",
+                              video_codec: Optional[str] = None) -> List[str]:
+        """Build H.264/HEVC encoder, CFR and pixel format options for one output"""
+        # With cuda/qsv decode the frames stay in VRAM all the way to the
+        # encoder, so CFR conversion must run as a filter on the GPU surfaces
+        # instead of via -r/-pix_fmt.
+        gpu_filter = None
+        if self.use_cuda_frames(video_codec):
+            gpu_filter = f"fps=fps={fps},scale_cuda=format=nv12"
+        elif self.hwaccel_flag == "qsv":
+            gpu_filter = f"fps=fps={fps},scale_qsv=format=nv12"
+        
+        cmd = []
+        rate_args = ["-vf", gpu_filter] if gpu_filter else ["-r", str(fps)]
         
         if self.hw_encoder == "nvenc":
-            cmd.extend(["-c:v", "h264_nvenc", "-preset", "slow", "-cq", "18", "-r", str(fps)])
+            preset, tune, cq, multipass = NVENC_SPEED_PRESETS.get(encode_speed, NVENC_SPEED_PRESETS['balanced'])
+            lookahead = NVENC_LOOKAHEAD
+            cmd.extend(["-c:v", f"{codec}_nvenc"])
+            if "p_presets" in self.nvenc_caps:
+                cmd.extend(["-preset", preset, "-tune", tune])
+                # Low-latency tunes are meant to run without lookahead
+                if tune in ("ll", "ull"):
+                    lookahead = 0
+            else:
+                cmd.extend(["-preset", "slow"])  # Legacy preset table on old FFmpeg builds
+            cmd.extend([
+                "-rc", "vbr", "-cq", cq, "-b:v", "0",
+                "-spatial_aq", "1", "-rc-lookahead", str(lookahead)
+            ])
+            if "temporal_aq" in self.nvenc_caps:
+                cmd.extend(["-temporal_aq", "1"])
+            if multipass and "multipass" in self.nvenc_caps:
+                cmd.extend(["-multipass", multipass])
+            # -split_encode_mode stays at the driver default (auto): it splits
+            # frames across NVENC engines only where the GPU has more than one
+            cmd.extend(rate_args)
         elif self.hw_encoder == "videotoolbox":
-            cmd.extend(["-c:v", "h264_videotoolbox", "-b:v", "10M", "-r", str(fps)])
+            cmd.extend(["-c:v", f"{codec}_videotoolbox", "-b:v", "10M"] + rate_args)
         elif self.hw_encoder == "qsv":
-            cmd.extend(["-c:v", "h264_qsv", "-preset", "slow", "-global_quality", "18", "-r", str(fps)])
+            cmd.extend(["-c:v", f"{codec}_qsv", "-preset", "veryfast", "-global_quality", "20"] + rate_args)
+            # Lookahead is only implemented by h264_qsv
+            if codec == "h264":
+                cmd.extend(["-look_ahead", "1"])
         else:
-            cmd.extend(["-c:v", "libx264", "-preset", "slow", "-crf", "18", "-r", str(fps)])
+            preset, crf = X264_SPEED_PRESETS.get(encode_speed, X264_SPEED_PRESETS['balanced'])
+            # Fixed 2-second GOP keeps seeking/scrubbing in the editor cheap
+            gop = max(1, round(fps * 2))
+            cmd.extend([
+                "-c:v", "libx264", "-preset", preset, "-tune", "film", "-crf", crf,
+                "-threads", str(self.encoder_threads()), "-filter_threads", "2",
+                "-x264-params", f"lookahead_threads=2:sliced_threads=0:keyint={gop}:min-keyint={gop}:scenecut=0"
+            ] + rate_args)
+        
+        if not gpu_filter:
+            cmd.extend(["-pix_fmt", "yuv420p"])
+        # Apple/Premiere only demux HEVC in MP4 with the hvc1 sample entry
+        if codec == "hevc":
+            cmd.extend(["-tag:v", "hvc1"])
+        return cmd
+    
+    def is_edit_ready_h264(self, probe: Dict, resolution: str) -> bool:
+        """Check whether a probed file already satisfies the H.264 CFR target"""
+        max_height = RESOLUTION_HEIGHTS.get(resolution, 0)
+        return (
+            probe['codec_name'] == 'h264'
+            # High 10 / 4:2:2 / 4:4:4 H.264 decodes poorly in NLEs
+            and probe['pix_fmt'] == 'yuv420p'
+            and probe['is_cfr']
+            and (not max_height or probe['height'] <= max_height)
+        )
+    
+    def build_audio_args(self, audio_codec: Optional[str], audio_bitrate: int) -> List[str]:
+        """Copy AAC audio that is already good enough, otherwise encode to AAC"""
+        # Containers often don't report a bitrate (0) - YouTube AAC is 128k
+        if audio_codec == 'aac' and (not audio_bitrate or audio_bitrate >= MIN_COPY_AUDIO_BITRATE):
+            return ["-c:a", "copy"]
+        return ["-c:a", "aac", "-b:a", "320k", "-ar", "48000"]
+    
+    def build_remux_command(self, input_file: str, output_file: str,
+                            audio_codec: Optional[str] = None, audio_bitrate: int = 0) -> List[str]:
+        """Build FFmpeg command that copies video into an MP4 without re-encoding"""
+        return [
+            "ffmpeg", "-i", input_file,
+            "-c:v", "copy", *self.build_audio_args(audio_codec, audio_bitrate),
+            "-movflags", "+faststart",
+            *FFMPEG_PROGRESS_ARGS,
+            "-y", output_file
+        ]
+    
+    def build_prores_command(self, input_file: str, output_file: str, fps: float,
+                             audio_file: Optional[str] = None, http_headers: Optional[Dict] = None) -> List[str]:
+        """Build FFmpeg command for ProRes 422 encoding"""
+        cmd = ["ffmpeg", *self.build_input_args(input_file, audio_file, http_headers)]
+        
+        if self.prores_encoder == "prores_videotoolbox":
+            # Apple Silicon media engine
+            cmd.extend(["-c:v", "prores_videotoolbox", "-profile:v", "standard"])
+        else:
+            cmd.extend(["-c:v", self.prores_encoder, "-profile:v", "2", "-vendor", "apl0",
+                        "-pix_fmt", "yuv422p10le", "-threads", str(self.encoder_threads()),
+                        "-filter_threads", "2"])
         
         cmd.extend([
-            "-c:a", "aac", "-b:a", "320k", "-ar", "48000",
-            "-pix_fmt", "yuv420p", "-movflags", "+faststart", 
+            "-r", str(fps),
+            "-c:a", "pcm_s16le", "-ar", "48000",
+            *FFMPEG_PROGRESS_ARGS,
             "-y", output_file
         ])
         return cmd
     
-    def build_prores_command(self, input_file: str, output_file: str, fps: float) -> List[str]:
-        """Build FFmpeg command for ProRes 422 encoding"""
-        return [
-            "ffmpeg", "-i", input_file,
-            "-c:v", "prores_ks", "-profile:v", "2", "-vendor", "apl0",
-            "-pix_fmt", "yuv422p10le", "-r", str(fps),
+    def build_hevc10_command(self, input_file: str, output_file: str, fps: float,
+                             audio_file: Optional[str] = None, http_headers: Optional[Dict] = None,
+                             video_codec: Optional[str] = None) -> List[str]:
+        """
+        Build FFmpeg command for near-lossless 10-bit HEVC on NVENC, a much
+        faster editing intermediate than CPU ProRes on NVIDIA systems.
+        """
+        cmd = ["ffmpeg", *self.build_hw_decode_args(video_codec),
+               *self.build_input_args(input_file, audio_file, http_headers)]
+        
+        if self.use_cuda_frames(video_codec):
+            cmd.extend(["-vf", f"fps=fps={fps},scale_cuda=format=p010le"])
+        else:
+            cmd.extend(["-r", str(fps), "-pix_fmt", "p010le"])
+        
+        cmd.extend(["-c:v", "hevc_nvenc"])
+        if "p_presets" in self.nvenc_caps:
+            cmd.extend(["-preset", "p6", "-tune", "hq"])
+        else:
+            cmd.extend(["-preset", "slow"])  # Legacy preset table on old FFmpeg builds
+        cmd.extend([
+            "-profile:v", "main10",
+            "-rc", "vbr", "-cq", "18", "-b:v", "0", "-tag:v", "hvc1",
             "-c:a", "pcm_s16le", "-ar", "48000",
+            *FFMPEG_PROGRESS_ARGS,
             "-y", output_file
-        ]
+        ])
+        return cmd
+    
+    def probe_video(self, video_file: str) -> Dict:
+        """
+        Probe a video with a single FFprobe call.
+        Returns a dict with 'fps' (normalized), 'fps_exact' (r_frame_rate),
+        'duration', 'codec_name', 'width', 'height' and 'is_cfr' keys.
+        """
+        try:
+            # Copied so callers can't alter the cached result
+            return dict(_probe_file(video_file, os.path.getmtime(video_file)))
+        except OSError:
+            return dict(PROBE_FALLBACK)
+    
+    def normalize_frame_rate(self, fps: float) -> float:
+        """Round to common frame rates"""
+        return normalize_frame_rate(fps)
     
     def detect_frame_rate(self, video_file: str) -> float:
         """Detect video frame rate using FFprobe"""
-        try:
-            cmd = [
-                "ffprobe", "-v", "error", "-select_streams", "v:0",
-                "-show_entries", "stream=r_frame_rate",
-                "-of", "default=noprint_wrappers=1:nokey=1", video_file
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            fps_str = result.stdout.strip()
-            
-            if '/' in fps_str:
-                num, den = map(int, fps_str.split('/'))
-                fps = num / den
-            else:
-                fps = float(fps_str)
-            
-            # Round to common frame rates
-            if 23 < fps < 25: return 24
-            elif 24 < fps < 26: return 25
-            elif 29 < fps < 31: return 30
-            elif 59 < fps < 61: return 60
-            else: return round(fps)
-        except:
-            return 30  # Fallback
+        return self.probe_video(video_file)['fps']
     
     def get_video_duration(self, video_file: str) -> float:
         """Get video duration in seconds"""
-        try:
-            cmd = [
-                "ffprobe", "-v", "error", "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1", video_file
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return float(result.stdout.strip())
-        except:
-            return 0
+        return self.probe_video(video_file)['duration']
     
-    def run_ffmpeg_with_progress(self, cmd: List[str], job: VideoJob, update_queue: queue.Queue, duration: float):
-        """Run FFmpeg and parse progress"""
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            universal_newlines=True, bufsize=1
-        )
+    def run_ffmpeg_with_progress(self, cmd: List[str], job: VideoJob, update_queue: queue.Queue, duration: float,
+                                 stdin=None, batch_jobs: Optional[List[VideoJob]] = None):
+        """
+        Run FFmpeg and parse its machine-readable -progress output.
+        For batch encodes, progress is published to every job in batch_jobs.
+        """
+        popen_kw = dict(SUBPROCESS_KW)
+        if stdin is not None:
+            popen_kw['stdin'] = stdin
         
-        time_pattern = re.compile(r'time=(\d+):(\d+):(\d+\.\d+)')
+        # stderr goes to a temp file so it can never block FFmpeg, and is only read on failure
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=stderr_file, bufsize=1 << 16, **popen_kw
+            )
+            self._read_ffmpeg_progress(process, batch_jobs or [job], update_queue, duration)
+            
+            process.wait()
+            if process.returncode != 0:
+                stderr_file.seek(0)
+                errors = stderr_file.read().decode(errors='replace').strip().splitlines()
+                raise ProcessError(f"FFmpeg encoding failed: {errors[-1] if errors else process.returncode}")
+    
+    def run_piped_ffmpeg(self, ffmpeg_cmd: List[str], feeder_cmd: List[str], job: VideoJob,
+                         update_queue: queue.Queue, duration: float):
+        """
+        Run FFmpeg on the output of a yt-dlp subprocess. yt-dlp dying midway
+        only looks like EOF to FFmpeg, which then finishes a truncated file,
+        so yt-dlp's exit status is checked as well.
+        """
+        cookie_file = self.export_cookies()
+        if cookie_file:
+            # Options go before the URL, the last argument
+            feeder_cmd = [*feeder_cmd[:-1], "--cookies", cookie_file, feeder_cmd[-1]]
         
+        try:
+            # Like FFmpeg's, yt-dlp's stderr goes to a temp file that is only read on failure
+            with tempfile.TemporaryFile() as feeder_stderr:
+                feeder = subprocess.Popen(feeder_cmd, stdout=subprocess.PIPE, stderr=feeder_stderr, **SUBPROCESS_KW)
+                try:
+                    try:
+                        self.run_ffmpeg_with_progress(ffmpeg_cmd, job, update_queue, duration, stdin=feeder.stdout)
+                    finally:
+                        feeder.stdout.close()
+                except Exception:
+                    # FFmpeg failed on its own unless yt-dlp had already died
+                    if feeder.poll() is None:
+                        feeder.kill()
+                        feeder.wait()
+                        raise
+                    if feeder.returncode == 0:
+                        raise
+                
+                # FFmpeg reached EOF, so yt-dlp has exited or is about to
+                if feeder.wait() != 0:
+                    feeder_stderr.seek(0)
+                    errors = feeder_stderr.read().decode(errors='replace').strip().splitlines()
+                    raise ProcessError(f"yt-dlp failed: {errors[-1] if errors else feeder.returncode}")
+        finally:
+            if cookie_file:
+                Path(cookie_file).unlink(missing_ok=True)
+    
+    def _read_ffmpeg_progress(self, process: subprocess.Popen, jobs: List[VideoJob], update_queue: queue.Queue, duration: float):
+        """Parse out_time_us lines from FFmpeg's -progress output"""
+        job = jobs[0]
         for line in process.stdout:
-            match = time_pattern.search(line)
-            if match and duration > 0:
-                h, m, s = match.groups()
-                current = int(h) * 3600 + int(m) * 60 + float(s)
-                progress = min((current / duration) * 100, 99)
-                update_queue.put({'url': job.url, 'progress': progress})
-        
-        process.wait()
-        if process.returncode != 0:
-            raise Exception("FFmpeg encoding failed")
+            if line.startswith(b'out_time_us=') and duration > 0:
+                try:
+                    current_us = int(line[12:])
+                except ValueError:
+                    continue  # FFmpeg reports N/A before the first frame
+                
+                # Throttle UI updates
+                now = time.monotonic()
+                if now - job.last_update < PROGRESS_UPDATE_INTERVAL:
+                    continue
+                job.last_update = now
+                
+                progress = min(current_us / 10000.0 / duration, 99)
+                for batch_job in jobs:
+                    self.publish_progress(batch_job, progress, update_queue)
     
     def sanitize_filename(self, filename: str) -> str:
         """Remove invalid characters from filename"""
         # Remove invalid characters
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+        filename = filename.translate(INVALID_FILENAME_CHARS)
         # Remove leading/trailing spaces and dots
         filename = filename.strip('. ')
         # Limit length
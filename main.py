@@ -10,12 +10,49 @@ from tkinter import filedialog, messagebox
 from tkinterdnd2 import TkinterDnD, DND_FILES 
 import threading
 import queue
+from collections import deque
 import os
 import sys
 import subprocess
 from pathlib import Path
 from typing import Dict, List
-from downloader_engine import DownloaderEngine, VideoJob
+from downloader_engine import DownloaderEngine, VideoJob, find_youtube_url
+
+# Map format selection to engine format
+FORMAT_MAP = {
+    "Pass-through (MP4/MKV)": "passthrough",
+    "Editor Ready (ProRes 422)": "prores",
+    "Editor Ready (H.264 CFR)": "h264_cfr",
+    "Editor Ready (HEVC 10-bit, NVENC)": "hevc10"
+}
+
+# Map encode speed selection to engine speed tier
+ENCODE_SPEED_MAP = {
+    "Archive (Best Quality)": "archive",
+    "Balanced": "balanced",
+    "Fast": "fast"
+}
+
+# Default output folder, resolved once at import
+DEFAULT_OUTPUT_DIR = Path.home() / "Downloads"
+
+# Queue items get widgets only up to this count; the rest wait behind a "Show more" button
+QUEUE_RENDER_LIMIT = 30
+
+FORMAT_DESCRIPTIONS = {
+    "Pass-through (MP4/MKV)": "Fast download, no re-encoding",
+    "Editor Ready (ProRes 422)": "Best for heavy editing - transcodes to MOV ProRes 422",
+    "Editor Ready (H.264 CFR)": "Fixes Premiere audio sync - converts to constant frame rate",
+    "Editor Ready (HEVC 10-bit, NVENC)": "ProRes alternative on NVIDIA GPUs - near-lossless 10-bit MOV, much faster"
+}
+
+STATUS_ICONS = {
+    "pending": "⏳",
+    "downloading": "⬇️",
+    "encoding": "⚙️",
+    "finished": "✅",
+    "failed": "❌"
+}
 
 # Configure CustomTkinter appearance
 ctk.set_appearance_mode("dark")
@@ -26,6 +63,9 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
     def __init__(self):
         super().__init__()
         
+        # Fonts are shared Tk resources; build each size/weight once and reuse it
+        self._fonts: Dict[tuple, ctk.CTkFont] = {}
+        
         # Initialize Drag & Drop
         self.TkdndVersion = TkinterDnD._require(self)
         
@@ -51,14 +91,20 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
             sys.exit(1)
         
         # Queue for thread communication
-        self.update_queue = queue.Queue()
+        self.update_queue = queue.SimpleQueue()  # many producers, one consumer (the Tk loop)
         
         # Video jobs dictionary
         self.video_jobs: Dict[str, VideoJob] = {}
+        self.pending_count = 0  # jobs with status "pending", kept in step with status changes
+        self.pending_jobs = deque()  # jobs not yet handed to the engine, in queue order
+        self.rendered_count = 0  # jobs that have queue widgets
+        self.unrendered_jobs = deque()  # jobs still waiting for widgets, in queue order
+        self.new_jobs: List[VideoJob] = []  # added since the last idle flush
         
         # UI State
         self.is_processing = False
-        self.output_dir = str(Path.home() / "Downloads")
+        self.run_errors: List[str] = []  # errors of the current run, shown when it completes
+        self.output_dir = str(DEFAULT_OUTPUT_DIR)
         
         # Build UI
         self.create_ui()
@@ -70,9 +116,20 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         except Exception as e:
             print(f"⚠ Drag & Drop disabled: {e}")
         
+        # Don't leave queued metadata fetches running after the window closes
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # Start update loop
         self.after(100, self.process_queue)
         
+    def _font(self, size: int, weight: str = "normal") -> ctk.CTkFont:
+        """Return the cached font for this size and weight"""
+        key = (size, weight)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = ctk.CTkFont(size=size, weight=weight)
+        return font
+    
     def create_ui(self):
         """Build the user interface"""
         
@@ -83,14 +140,14 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         title_label = ctk.CTkLabel(
             header,
             text="YouTube to Premiere Pro",
-            font=ctk.CTkFont(size=28, weight="bold")
+            font=self._font(28, "bold")
         )
         title_label.pack()
         
         subtitle_label = ctk.CTkLabel(
             header,
             text="Professional video downloader optimized for Adobe Premiere Pro",
-            font=ctk.CTkFont(size=12),
+            font=self._font(12),
             text_color="gray"
         )
         subtitle_label.pack()
@@ -135,7 +192,7 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         res_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
         res_frame.pack(side="left", fill="x", expand=True, padx=(0, 10))
         
-        ctk.CTkLabel(res_frame, text="Resolution", font=ctk.CTkFont(size=12)).pack(anchor="w")
+        ctk.CTkLabel(res_frame, text="Resolution", font=self._font(12)).pack(anchor="w")
         self.resolution_var = tk.StringVar(value="1080p (Full HD)")
         resolution_combo = ctk.CTkComboBox(
             res_frame,
@@ -149,15 +206,13 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         format_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
         format_frame.pack(side="left", fill="x", expand=True, padx=(0, 10))
         
-        ctk.CTkLabel(format_frame, text="Format Mode", font=ctk.CTkFont(size=12)).pack(anchor="w")
+        ctk.CTkLabel(format_frame, text="Format Mode", font=self._font(12)).pack(anchor="w")
         self.format_var = tk.StringVar(value="Pass-through (MP4/MKV)")
         format_combo = ctk.CTkComboBox(
             format_frame,
-            values=[
-                "Pass-through (MP4/MKV)",
-                "Editor Ready (ProRes 422)",
-                "Editor Ready (H.264 CFR)"
-            ],
+            # The HEVC 10-bit intermediate needs an NVIDIA encoder
+            values=[name for name, mode in FORMAT_MAP.items()
+                    if mode != "hevc10" or self.engine.hw_encoder == "nvenc"],
             variable=self.format_var,
             state="readonly",
             command=self.on_format_change
@@ -168,13 +223,13 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         output_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
         output_frame.pack(side="left", fill="x", expand=True)
         
-        ctk.CTkLabel(output_frame, text="Output Directory", font=ctk.CTkFont(size=12)).pack(anchor="w")
+        ctk.CTkLabel(output_frame, text="Output Directory", font=self._font(12)).pack(anchor="w")
         
         output_row = ctk.CTkFrame(output_frame, fg_color="transparent")
         output_row.pack(fill="x", pady=(5, 0))
         
-        self.output_entry = ctk.CTkEntry(output_row, height=32)
-        self.output_entry.insert(0, self.output_dir)
+        self.output_var = tk.StringVar(value=self.output_dir)
+        self.output_entry = ctk.CTkEntry(output_row, height=32, textvariable=self.output_var)
         self.output_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
         
         browse_btn = ctk.CTkButton(
@@ -185,11 +240,84 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         )
         browse_btn.pack(side="left")
         
+        # Concurrency Settings
+        concurrency_frame = ctk.CTkFrame(input_frame, fg_color="transparent")
+        concurrency_frame.pack(fill="x", padx=15, pady=(0, 15))
+        
+        download_workers_frame = ctk.CTkFrame(concurrency_frame, fg_color="transparent")
+        download_workers_frame.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        ctk.CTkLabel(download_workers_frame, text="Parallel Downloads", font=self._font(12)).pack(anchor="w")
+        self.download_workers_var = tk.StringVar(value=str(self.engine.download_concurrency))
+        download_workers_combo = ctk.CTkComboBox(
+            download_workers_frame,
+            values=["1", "2", "3", "4"],
+            variable=self.download_workers_var,
+            state="readonly"
+        )
+        download_workers_combo.pack(fill="x", pady=(5, 0))
+        
+        encode_workers_frame = ctk.CTkFrame(concurrency_frame, fg_color="transparent")
+        encode_workers_frame.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        ctk.CTkLabel(encode_workers_frame, text="Parallel Encodes", font=self._font(12)).pack(anchor="w")
+        self.encode_workers_var = tk.StringVar(value=str(self.engine.encode_concurrency))
+        encode_workers_combo = ctk.CTkComboBox(
+            encode_workers_frame,
+            values=["1", "2", "3", "4"],
+            variable=self.encode_workers_var,
+            state="readonly"
+        )
+        encode_workers_combo.pack(fill="x", pady=(5, 0))
+        
+        encode_speed_frame = ctk.CTkFrame(concurrency_frame, fg_color="transparent")
+        encode_speed_frame.pack(side="left", fill="x", expand=True)
+        
+        ctk.CTkLabel(encode_speed_frame, text="Encode Speed", font=self._font(12)).pack(anchor="w")
+        self.encode_speed_var = tk.StringVar(value="Balanced")
+        encode_speed_combo = ctk.CTkComboBox(
+            encode_speed_frame,
+            values=list(ENCODE_SPEED_MAP),
+            variable=self.encode_speed_var,
+            state="readonly"
+        )
+        encode_speed_combo.pack(fill="x", pady=(5, 0))
+        
+        # Advanced Options
+        options_frame = ctk.CTkFrame(input_frame, fg_color="transparent")
+        options_frame.pack(fill="x", padx=15, pady=(0, 10))
+        
+        self.stream_urls_var = tk.BooleanVar(value=self.engine.stream_urls)
+        ctk.CTkCheckBox(
+            options_frame,
+            text="Stream directly into FFmpeg (may be throttled)",
+            variable=self.stream_urls_var,
+            font=self._font(12)
+        ).pack(side="left", padx=(0, 15))
+        
+        self.use_aria2c_var = tk.BooleanVar(value=self.engine.use_aria2c)
+        if self.engine.aria2c_available:
+            ctk.CTkCheckBox(
+                options_frame,
+                text="aria2c downloads (no live progress)",
+                variable=self.use_aria2c_var,
+                font=self._font(12)
+            ).pack(side="left", padx=(0, 15))
+        
+        self.hevc_4k_var = tk.BooleanVar(value=self.engine.hevc_4k)
+        if self.engine.can_encode_hevc():
+            ctk.CTkCheckBox(
+                options_frame,
+                text="HEVC for 4K (H.264 CFR mode)",
+                variable=self.hevc_4k_var,
+                font=self._font(12)
+            ).pack(side="left", padx=(0, 15))
+        
         # Format description
         self.format_desc = ctk.CTkLabel(
             input_frame,
             text="Fast download, no re-encoding",
-            font=ctk.CTkFont(size=11),
+            font=self._font(11),
             text_color="gray"
         )
         self.format_desc.pack(padx=15, pady=(0, 10))
@@ -204,7 +332,7 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         ctk.CTkLabel(
             queue_header,
             text="Download Queue",
-            font=ctk.CTkFont(size=16, weight="bold")
+            font=self._font(16, "bold")
         ).pack(side="left")
         
         # Scrollable frame for videos
@@ -215,15 +343,32 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         self.empty_label = ctk.CTkLabel(
             self.queue_scroll,
             text="📹\n\nNo videos in queue\nAdd URLs to get started",
-            font=ctk.CTkFont(size=14),
+            font=self._font(14),
             text_color="gray"
         )
         self.empty_label.pack(pady=50)
         
+        # Stays last in the queue while some jobs have no widgets yet
+        self.show_more_btn = ctk.CTkButton(
+            self.queue_scroll,
+            text="",
+            height=28,
+            fg_color="gray30",
+            hover_color="gray20",
+            command=self.render_more_items
+        )
+        
         # Progress Section
         progress_frame = ctk.CTkFrame(self)
         progress_frame.pack(fill="x", padx=20, pady=(0, 10))
         
+        # Progress widgets follow these vars; updates just set() them
+        self.current_pct_var = tk.StringVar(value="0%")
+        self.current_progress_var = tk.DoubleVar(value=0.0)
+        self.total_pct_var = tk.StringVar(value="0%")
+        self.total_progress_var = tk.DoubleVar(value=0.0)
+        self.last_total_pct = 0  # whole percent the total bar shows
+        
         # Current file progress
         current_frame = ctk.CTkFrame(progress_frame, fg_color="transparent")
         current_frame.pack(fill="x", padx=15, pady=(15, 10))
@@ -234,20 +379,19 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         ctk.CTkLabel(
             current_label_row,
             text="Current File",
-            font=ctk.CTkFont(size=12)
+            font=self._font(12)
         ).pack(side="left")
         
         self.current_percent_label = ctk.CTkLabel(
             current_label_row,
-            text="0%",
-            font=ctk.CTkFont(size=12),
+            textvariable=self.current_pct_var,
+            font=self._font(12),
             text_color="#3b82f6"
         )
         self.current_percent_label.pack(side="right")
         
-        self.current_progress = ctk.CTkProgressBar(current_frame, height=12)
+        self.current_progress = ctk.CTkProgressBar(current_frame, height=12, variable=self.current_progress_var)
         self.current_progress.pack(fill="x", pady=(5, 0))
-        self.current_progress.set(0)
         
         # Total progress
         total_frame = ctk.CTkFrame(progress_frame, fg_color="transparent")
@@ -259,20 +403,19 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         ctk.CTkLabel(
             total_label_row,
             text="Total Progress",
-            font=ctk.CTkFont(size=12)
+            font=self._font(12)
         ).pack(side="left")
         
         self.total_percent_label = ctk.CTkLabel(
             total_label_row,
-            text="0%",
-            font=ctk.CTkFont(size=12),
+            textvariable=self.total_pct_var,
+            font=self._font(12),
             text_color="#a855f7"
         )
         self.total_percent_label.pack(side="right")
         
-        self.total_progress = ctk.CTkProgressBar(total_frame, height=12)
+        self.total_progress = ctk.CTkProgressBar(total_frame, height=12, variable=self.total_progress_var)
         self.total_progress.pack(fill="x", pady=(5, 0))
-        self.total_progress.set(0)
         
         # Action Buttons
         action_frame = ctk.CTkFrame(self)
@@ -285,7 +428,7 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
             button_row,
             text="Start Download (0)",
             height=40,
-            font=ctk.CTkFont(size=14, weight="bold"),
+            font=self._font(14, "bold"),
             command=self.start_download
         )
         self.start_btn.pack(side="left", fill="x", expand=True, padx=(0, 10))
@@ -305,28 +448,24 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         info_label = ctk.CTkLabel(
             self,
             text=f"FFmpeg • Hardware: {hw_info} • VFR to CFR conversion",
-            font=ctk.CTkFont(size=10),
+            font=self._font(10),
             text_color="gray40"
         )
         info_label.pack(pady=(0, 10))
     
     def on_format_change(self, choice):
         """Update description when format changes"""
-        descriptions = {
-            "Pass-through (MP4/MKV)": "Fast download, no re-encoding",
-            "Editor Ready (ProRes 422)": "Best for heavy editing - transcodes to MOV ProRes 422",
-            "Editor Ready (H.264 CFR)": "Fixes Premiere audio sync - converts to constant frame rate"
-        }
-        self.format_desc.configure(text=descriptions.get(choice, ""))
+        self.format_desc.configure(text=FORMAT_DESCRIPTIONS.get(choice, ""))
     
     def paste_from_clipboard(self):
         """Paste URL from clipboard"""
         try:
             clipboard_text = self.clipboard_get()
             if clipboard_text:
+                url = find_youtube_url(clipboard_text)
                 self.url_entry.delete(0, tk.END)
-                self.url_entry.insert(0, clipboard_text)
-                if "youtube.com" in clipboard_text or "youtu.be" in clipboard_text:
+                self.url_entry.insert(0, url or clipboard_text)
+                if url:
                     self.add_url()
         except:
             pass
@@ -336,14 +475,15 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         directory = filedialog.askdirectory(initialdir=self.output_dir)
         if directory:
             self.output_dir = directory
-            self.output_entry.delete(0, tk.END)
-            self.output_entry.insert(0, directory)
+            self.output_var.set(directory)
     
     def add_url(self):
         """Add URL to queue"""
         url = self.url_entry.get().strip()
         if not url:
             return
+        # Typed YouTube links may lack the scheme; other URLs go to yt-dlp as-is
+        url = find_youtube_url(url) or url
         
         if url in self.video_jobs:
             messagebox.showwarning("Duplicate", "This URL is already in the queue.")
@@ -355,22 +495,36 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         # Create video job
         job = VideoJob(url)
         self.video_jobs[url] = job
+        self.pending_count += 1
+        self.pending_jobs.append(job)
         
-        # Create UI element for this job
-        self.create_video_item(job)
+        # Widgets and the info fetch are set up in one idle pass, so a bulk
+        # paste/drop lays out the queue once instead of once per URL
+        if not self.new_jobs:
+            self.after_idle(self.flush_new_jobs)
+        self.new_jobs.append(job)
         
         # Clear entry
         self.url_entry.delete(0, tk.END)
         
-        # Fetch video info in background
-        threading.Thread(
-            target=self.engine.fetch_video_info,
-            args=(job, self.update_queue),
-            daemon=True
-        ).start()
-        
         self.update_start_button()
     
+    def flush_new_jobs(self):
+        """Create queue items and start info fetches for newly added jobs"""
+        jobs, self.new_jobs = self.new_jobs, []
+        for job in jobs:
+            # Create UI element for this job, or defer it once the queue is long
+            if self.rendered_count < QUEUE_RENDER_LIMIT and not self.unrendered_jobs:
+                self.create_video_item(job)
+            else:
+                self.unrendered_jobs.append(job)
+            
+            # Fetch video info in background
+            self.engine.submit_fetch(job, self.update_queue)
+        
+        self.update_show_more()
+        self.queue_scroll.update_idletasks()
+    
     def create_video_item(self, job: VideoJob):
         """Create UI element for video"""
         item_frame = ctk.CTkFrame(self.queue_scroll)
@@ -386,20 +540,20 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         title_row = ctk.CTkFrame(left_side, fg_color="transparent")
         title_row.pack(fill="x", anchor="w")
         
-        job.status_icon = ctk.CTkLabel(title_row, text="⏳", font=ctk.CTkFont(size=16))
+        job.status_icon = ctk.CTkLabel(title_row, text=STATUS_ICONS.get(job.status, "⏳"), font=self._font(16))
         job.status_icon.pack(side="left", padx=(0, 8))
         
         job.title_label = ctk.CTkLabel(
             title_row,
-            text="Fetching info...",
-            font=ctk.CTkFont(size=13, weight="bold")
+            text=job.title[:100],
+            font=self._font(13, "bold")
         )
         job.title_label.pack(side="left", anchor="w")
         
         url_label = ctk.CTkLabel(
             left_side,
             text=job.url[:80] + "..." if len(job.url) > 80 else job.url,
-            font=ctk.CTkFont(size=10),
+            font=self._font(10),
             text_color="gray"
         )
         url_label.pack(anchor="w", pady=(2, 0))
@@ -407,29 +561,50 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         # Progress bar (hidden initially)
         job.progress_frame = ctk.CTkFrame(left_side, fg_color="transparent")
         
-        job.progress_bar = ctk.CTkProgressBar(job.progress_frame, height=8)
+        job.progress_var = tk.DoubleVar(value=0.0)
+        job.progress_text_var = tk.StringVar(value="")
+        
+        job.progress_bar = ctk.CTkProgressBar(job.progress_frame, height=8, variable=job.progress_var)
         job.progress_bar.pack(fill="x", pady=(8, 0))
-        job.progress_bar.set(0)
         
         job.progress_label = ctk.CTkLabel(
             job.progress_frame,
-            text="",
-            font=ctk.CTkFont(size=10),
+            textvariable=job.progress_text_var,
+            font=self._font(10),
             text_color="gray"
         )
         job.progress_label.pack(anchor="w", pady=(2, 0))
         
         job.ui_frame = item_frame
+        self.rendered_count += 1
+        
+        # Jobs rendered late may already be running
+        if job.status in ["downloading", "encoding"]:
+            job.last_shown_pct = -1
+            self.show_job_progress(job, job.progress)
+    
+    def render_more_items(self):
+        """Create widgets for the next block of deferred jobs"""
+        for _ in range(min(QUEUE_RENDER_LIMIT, len(self.unrendered_jobs))):
+            self.create_video_item(self.unrendered_jobs.popleft())
+        self.update_show_more()
+    
+    def update_show_more(self):
+        """Keep the "Show more" button last in the queue with the hidden count"""
+        self.show_more_btn.pack_forget()
+        if self.unrendered_jobs:
+            self.show_more_btn.configure(text=f"Show more ({len(self.unrendered_jobs)} hidden)")
+            self.show_more_btn.pack(fill="x", pady=5)
     
     def handle_drop(self, event):
         """Handle drag and drop"""
         try:
             files = self.tk.splitlist(event.data)
             for file in files:
-                clean_file = file.strip('{}').strip()
-                if "youtube.com" in clean_file or "youtu.be" in clean_file:
+                url = find_youtube_url(file)
+                if url:
                     self.url_entry.delete(0, tk.END)
-                    self.url_entry.insert(0, clean_file)
+                    self.url_entry.insert(0, url)
                     self.add_url()
         except Exception as e:
             print(f"Drop error: {e}")
@@ -439,124 +614,204 @@ class YTPremiereDownloader(ctk.CTk, TkinterDnD.DnDWrapper):
         if self.is_processing:
             return
         
-        pending_jobs = [j for j in self.video_jobs.values() if j.status == "pending"]
+        # Jobs whose metadata fetch failed stay in the deque but are no longer pending
+        pending_jobs = [j for j in self.pending_jobs if j.status == "pending"]
         if not pending_jobs:
+            self.pending_jobs.clear()
             messagebox.showinfo("No Videos", "No pending videos to download.")
             return
         
+        # Check the output folder up front instead of failing every job on it
+        output_dir = self.output_var.get().strip()
+        if not os.path.isdir(output_dir) or not os.access(output_dir, os.W_OK):
+            messagebox.showerror("Output Directory", f"Cannot write to output directory:\n{output_dir}")
+            return
+        
+        # Hand the engine everything queued so far; later adds wait for the next run
+        self.pending_jobs.clear()
+        
         self.is_processing = True
+        self.run_errors = []
         self.start_btn.configure(state="disabled", text="Processing...")
         
         # Get settings
         resolution = self.resolution_var.get()
         format_mode = self.format_var.get()
-        output_dir = self.output_entry.get()
-        
-        # Map format selection to engine format
-        format_map = {
-            "Pass-through (MP4/MKV)": "passthrough",
-            "Editor Ready (ProRes 422)": "prores",
-            "Editor Ready (H.264 CFR)": "h264_cfr"
-        }
+        self.engine.download_concurrency = int(self.download_workers_var.get())
+        self.engine.encode_concurrency = int(self.encode_workers_var.get())
+        self.engine.stream_urls = self.stream_urls_var.get()
+        self.engine.use_aria2c = self.use_aria2c_var.get()
+        self.engine.hevc_4k = self.hevc_4k_var.get()
         
         # Start download thread
         threading.Thread(
             target=self.engine.process_queue,
-            args=(pending_jobs, resolution, format_map[format_mode], output_dir, self.update_queue),
+            args=(pending_jobs, resolution, FORMAT_MAP[format_mode], output_dir, self.update_queue,
+                  ENCODE_SPEED_MAP[self.encode_speed_var.get()]),
             daemon=True
         ).start()
     
     def process_queue(self):
         """Process updates from background threads"""
+        # Drain everything queued since the last tick and merge it per job
+        # (latest value wins), so each job's widgets are configured once
+        latest: Dict[str, dict] = {}
+        errors = []
+        total_progress = None
+        all_complete = False
+        
         try:
             while True:
                 update = self.update_queue.get_nowait()
                 
-                url = update.get("url")
-                job = self.video_jobs.get(url)
-                
-                if not job:
+                # Coalesced progress update - the job itself is enqueued
+                if isinstance(update, VideoJob):
+                    state = update.progress_state
+                    state.queued = False  # clear first so newer updates re-enqueue the job
+                    latest.setdefault(update.url, {})["progress"] = state.progress
                     continue
                 
-                # Update job
-                if "title" in update:
-                    job.title = update["title"]
-                    job.title_label.configure(text=job.title[:100])
-                
-                if "status" in update:
-                    job.status = update["status"]
-                    status_icons = {
-                        "pending": "⏳",
-                        "downloading": "⬇️",
-                        "encoding": "⚙️",
-                        "finished": "✅",
-                        "failed": "❌"
-                    }
-                    job.status_icon.configure(text=status_icons.get(job.status, "⏳"))
-                
-                if "progress" in update:
-                    job.progress = update["progress"]
-                    
-                    if job.status in ["downloading", "encoding"]:
-                        job.progress_frame.pack(fill="x", pady=(8, 0))
-                        job.progress_bar.set(job.progress / 100)
-                        
-                        status_text = "Downloading" if job.status == "downloading" else "Encoding"
-                        job.progress_label.configure(
-                            text=f"{status_text} - {int(job.progress)}%"
-                        )
-                        
-                        # Update current progress
-                        self.current_progress.set(job.progress / 100)
-                        self.current_percent_label.configure(text=f"{int(job.progress)}%")
-                
-                if "total_progress" in update:
-                    total = update["total_progress"]
-                    self.total_progress.set(total / 100)
-                    self.total_percent_label.configure(text=f"{int(total)}%")
-                
                 if "error" in update:
-                    messagebox.showerror("Download Error", update["error"])
-                
+                    errors.append(update["error"])
+                if "total_progress" in update:
+                    total_progress = update["total_progress"]
                 if update.get("all_complete"):
-                    self.is_processing = False
-                    self.start_btn.configure(state="normal", text="Start Download")
-                    self.current_progress.set(0)
-                    self.current_percent_label.configure(text="0%")
-                    messagebox.showinfo("Complete", "All downloads finished!")
-                
-                self.update_start_button()
+                    all_complete = True
                 
+                url = update.get("url")
+                if url:
+                    latest.setdefault(url, {}).update(update)
         except queue.Empty:
             pass
         
-        self.after(100, self.process_queue)
+        for url, update in latest.items():
+            job = self.video_jobs.get(url)
+            if job:
+                self.apply_job_update(job, update)
+        
+        if total_progress is not None and int(total_progress) != self.last_total_pct:
+            self.last_total_pct = int(total_progress)
+            self.total_progress_var.set(total_progress / 100)
+            self.total_pct_var.set(f"{self.last_total_pct}%")
+        
+        if errors:
+            self.run_errors.extend(errors)
+        
+        if all_complete:
+            self.is_processing = False
+            self.start_btn.configure(state="normal", text="Start Download")
+            self.current_progress_var.set(0)
+            self.current_pct_var.set("0%")
+            self.show_run_summary(self.run_errors)
+            self.run_errors = []
+        elif self.run_errors and not self.is_processing:
+            # No run will complete to report these; show them now
+            self.show_run_summary(self.run_errors)
+            self.run_errors = []
+        
+        if latest or all_complete:
+            self.update_start_button()
+        
+        # Poll fast while jobs run, back off when idle to cut Tcl wakeups
+        self.after(50 if self.is_processing else 250, self.process_queue)
+    
+    def show_run_summary(self, errors: List[str]):
+        """Show one dialog for a finished run: its errors, or that everything finished"""
+        if errors:
+            summary = "\n".join(errors[:10])
+            if len(errors) > 10:
+                summary += f"\n... and {len(errors) - 10} more"
+            show = lambda: messagebox.showerror("Download Errors", summary)
+        else:
+            show = lambda: messagebox.showinfo("Complete", "All downloads finished!")
+        # Modal dialogs run a nested event loop; open it once the drain is done
+        self.after_idle(show)
+    
+    def apply_job_update(self, job: VideoJob, update: dict):
+        """Apply one merged update to a job's widgets"""
+        # Deferred jobs keep their state on the job; widgets read it when created
+        has_widgets = job.ui_frame is not None
+        
+        # Merged updates often repeat what the job already shows; skip those Tk calls
+        if "title" in update and update["title"] != job.title:
+            job.title = update["title"]
+            if has_widgets:
+                job.title_label.configure(text=job.title[:100])
+        
+        if "status" in update and update["status"] != job.status:
+            if job.status == "pending" and update["status"] != "pending":
+                self.pending_count -= 1
+            elif job.status != "pending" and update["status"] == "pending":
+                self.pending_count += 1
+                self.pending_jobs.append(job)
+            job.status = update["status"]
+            job.last_shown_pct = -1  # the progress label names the stage; redraw it
+            if has_widgets:
+                job.status_icon.configure(text=STATUS_ICONS.get(job.status, "⏳"))
+        
+        if "progress" in update:
+            self.show_job_progress(job, update["progress"])
+    
+    def show_job_progress(self, job: VideoJob, progress: float):
+        """Update progress widgets for a job"""
+        job.progress = progress
+        
+        # Widgets only show whole percents; skip updates that wouldn't change them
+        pct = int(progress)
+        if pct == job.last_shown_pct:
+            return
+        job.last_shown_pct = pct
+        
+        if job.status in ["downloading", "encoding"]:
+            if job.ui_frame is not None:
+                if not job.progress_shown:
+                    job.progress_frame.pack(fill="x", pady=(8, 0))
+                    job.progress_shown = True
+                job.progress_var.set(job.progress / 100)
+                
+                status_text = "Downloading" if job.status == "downloading" else "Encoding"
+                job.progress_text_var.set(f"{status_text} - {pct}%")
+            
+            # Update current progress
+            self.current_progress_var.set(job.progress / 100)
+            self.current_pct_var.set(f"{pct}%")
     
     def update_start_button(self):
         """Update start button text"""
-        pending_count = sum(1 for j in self.video_jobs.values() if j.status == "pending")
         if not self.is_processing:
-            self.start_btn.configure(text=f"Start Download ({pending_count})")
+            self.start_btn.configure(text=f"Start Download ({self.pending_count})")
     
     def clear_finished(self):
         """Remove finished videos from queue"""
-        to_remove = []
-        for url, job in self.video_jobs.items():
+        for url, job in list(self.video_jobs.items()):
             if job.status == "finished":
-                job.ui_frame.destroy()
-                to_remove.append(url)
-        
-        for url in to_remove:
-            del self.video_jobs[url]
-        
-        self.total_progress.set(0)
-        self.total_percent_label.configure(text="0%")
+                if job.ui_frame is not None:
+                    job.ui_frame.destroy()
+                    self.rendered_count -= 1
+                del self.video_jobs[url]
+        
+        # Fill the freed slots with deferred jobs
+        self.unrendered_jobs = deque(j for j in self.unrendered_jobs if j.status != "finished")
+        for _ in range(min(QUEUE_RENDER_LIMIT - self.rendered_count, len(self.unrendered_jobs))):
+            self.create_video_item(self.unrendered_jobs.popleft())
+        self.update_show_more()
+        self.queue_scroll.update_idletasks()
+        
+        self.total_progress_var.set(0)
+        self.total_pct_var.set("0%")
+        self.last_total_pct = 0
         
         if not self.video_jobs:
             self.empty_label.pack(pady=50)
         
         self.update_start_button()
 
+    
+    def on_close(self):
+        """Stop background work and close the window"""
+        self.engine.shutdown()
+        self.destroy()
+
 
 if __name__ == "__main__":
     print("=" * 60)
@@ -0,0 +1,382 @@
+"""Tests for FFmpeg command building and job handling in downloader_engine"""
+
+import errno
+import importlib.util
+import io
+import json
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import downloader_engine
+from downloader_engine import DownloaderEngine, ProcessError, VideoJob
+
+
+def make_engine(hw_encoder="nvenc", hwaccel_flag="cuda", encode_concurrency=2, cuda_scale_format=True):
+    """An engine with fixed capabilities, skipping the FFmpeg probes of __init__"""
+    engine = DownloaderEngine.__new__(DownloaderEngine)
+    engine.hw_encoder = hw_encoder
+    engine.hwaccel_flag = hwaccel_flag
+    engine.cuda_scale_format = cuda_scale_format
+    engine.nvenc_caps = set()
+    engine.encode_concurrency = encode_concurrency
+    engine.hevc_4k = False
+    engine._output_lock = threading.Lock()
+    engine._output_names = {}
+    return engine
+
+
+def source(video, audio=None):
+    """A URL source dict as returned by the download stage"""
+    return {'video': video, 'audio': audio, 'http_headers': None, 'audio_codec': 'aac', 'audio_bitrate': 128000}
+
+
+class BatchCommandTest(unittest.TestCase):
+    def test_maps_point_at_each_clips_own_inputs(self):
+        items = [
+            (source("https://v/a", "https://a/a"), "a.mp4", 30),
+            (source("https://v/b"), "b.mp4", 25),
+            (source("https://v/c", "https://a/c"), "c.mp4", 60),
+        ]
+        cmd = make_engine().build_h264_batch_command(items)
+        
+        inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+        self.assertEqual(inputs, ["https://v/a", "https://a/a", "https://v/b", "https://v/c", "https://a/c"])
+        
+        # Maps come right before the output they belong to
+        maps = {}
+        current = []
+        for i, arg in enumerate(cmd):
+            if arg == "-map":
+                current.append(cmd[i + 1])
+            elif arg in ("a.mp4", "b.mp4", "c.mp4"):
+                maps[arg], current = current, []
+        
+        self.assertEqual(maps, {
+            "a.mp4": ["0:v:0", "1:a:0"],
+            "b.mp4": ["2:v:0", "2:a:0?"],
+            "c.mp4": ["3:v:0", "4:a:0"],
+        })
+        for output, (clip, _, _) in zip(("a.mp4", "b.mp4", "c.mp4"), items):
+            video_index = int(maps[output][0].split(":")[0])
+            audio_index = int(maps[output][1].split(":")[0])
+            self.assertEqual(inputs[video_index], clip['video'])
+            self.assertEqual(inputs[audio_index], clip['audio'] or clip['video'])
+    
+    def test_batch_size_stays_within_nvenc_sessions(self):
+        from downloader_engine import NVENC_MAX_SESSIONS
+        for concurrency in (1, 2, 3, 8):
+            engine = make_engine(encode_concurrency=concurrency)
+            self.assertLessEqual(engine.batch_size_limit() * concurrency, max(NVENC_MAX_SESSIONS, concurrency))
+
+
+class CudaFallbackTest(unittest.TestCase):
+    def assert_system_memory_frames(self, cmd, pix_fmt):
+        self.assertNotIn("-hwaccel_output_format", cmd)
+        self.assertNotIn("-extra_hw_frames", cmd)
+        self.assertFalse(any("scale_cuda" in arg for arg in cmd))
+        self.assertEqual(cmd[cmd.index("-r") + 1], "30")
+        self.assertEqual(cmd[cmd.index("-pix_fmt") + 1], pix_fmt)
+        self.assertEqual(cmd[cmd.index("-hwaccel") + 1], "cuda")
+    
+    def test_cuda_frames_for_nvdec_codecs(self):
+        cmd = make_engine().build_h264_cfr_command("in.mp4", "out.mp4", 30, video_codec="avc1.640028")
+        self.assertEqual(cmd[cmd.index("-hwaccel_output_format") + 1], "cuda")
+        self.assertIn("fps=fps=30,scale_cuda=format=nv12", cmd)
+        self.assertNotIn("-pix_fmt", cmd)
+    
+    def test_falls_back_without_scale_cuda_format(self):
+        engine = make_engine(cuda_scale_format=False)
+        self.assert_system_memory_frames(
+            engine.build_h264_cfr_command("in.mp4", "out.mp4", 30, video_codec="h264"), "yuv420p")
+        self.assert_system_memory_frames(
+            engine.build_hevc10_command("in.mp4", "out.mov", 30, video_codec="h264"), "p010le")
+    
+    def test_falls_back_for_codecs_nvdec_may_not_decode(self):
+        engine = make_engine()
+        for video_codec in ("vp09.00.51.08", "av01.0.12M.08", None):
+            self.assert_system_memory_frames(
+                engine.build_h264_cfr_command("in.mp4", "out.mp4", 30, video_codec=video_codec), "yuv420p")
+            self.assert_system_memory_frames(
+                engine.build_hevc10_command("in.mp4", "out.mov", 30, video_codec=video_codec), "p010le")
+
+
+class ReserveOutputFileTest(unittest.TestCase):
+    def job(self, url, title):
+        job = VideoJob(url)
+        job.title = title
+        return job
+    
+    def test_same_title_gets_a_counter(self):
+        engine = make_engine()
+        first = engine.reserve_output_file(self.job("u1", "Clip"), Path("out"), "_CFR.mp4")
+        second = engine.reserve_output_file(self.job("u2", "clip"), Path("out"), "_CFR.mp4")
+        third = engine.reserve_output_file(self.job("u3", "Clip"), Path("out"), "_CFR.mp4")
+        self.assertEqual(first, str(Path("out") / "Clip_CFR.mp4"))
+        # Case-insensitive filesystems treat "clip" and "Clip" as one file
+        self.assertEqual(second, str(Path("out") / "clip (2)_CFR.mp4"))
+        self.assertEqual(third, str(Path("out") / "Clip (3)_CFR.mp4"))
+    
+    def test_retry_gets_its_own_name_back(self):
+        engine = make_engine()
+        job = self.job("u1", "Clip")
+        engine.reserve_output_file(self.job("u0", "Clip"), Path("out"), "_CFR.mp4")
+        name = engine.reserve_output_file(job, Path("out"), "_CFR.mp4")
+        self.assertEqual(engine.reserve_output_file(job, Path("out"), "_CFR.mp4"), name)
+    
+    def test_other_suffixes_and_invalid_characters(self):
+        engine = make_engine()
+        engine.reserve_output_file(self.job("u1", "Clip"), Path("out"), "_CFR.mp4")
+        self.assertEqual(engine.reserve_output_file(self.job("u2", "Clip"), Path("out"), "_ProRes.mov"),
+                         str(Path("out") / "Clip_ProRes.mov"))
+        self.assertEqual(engine.reserve_output_file(self.job("u3", 'a/b: "c"?'), Path("out"), "_CFR.mp4"),
+                         str(Path("out") / "ab c_CFR.mp4"))
+
+
+@unittest.skipUnless(importlib.util.find_spec("yt_dlp"), "yt-dlp is not installed")
+class TransientErrorTest(unittest.TestCase):
+    def setUp(self):
+        from yt_dlp.utils import DownloadError
+        self.DownloadError = DownloadError
+        self.engine = make_engine()
+    
+    def test_network_and_process_errors_are_retried(self):
+        for error in (ProcessError("ffmpeg exited with 1"), ConnectionError(), TimeoutError(),
+                      self.DownloadError("HTTP Error 503: Service Unavailable")):
+            self.assertTrue(self.engine.is_transient_error(error), error)
+    
+    def test_permanent_errors_are_not_retried(self):
+        for marker in downloader_engine.PERMANENT_ERROR_MARKERS:
+            error = self.DownloadError(f"ERROR: [youtube] abc: {marker.capitalize()}")
+            self.assertFalse(self.engine.is_transient_error(error), marker)
+        self.assertFalse(self.engine.is_transient_error(FileNotFoundError("ffmpeg")))
+    
+    def test_full_disk_is_not_retried(self):
+        cause = OSError(errno.ENOSPC, "No space left on device")
+        error = self.DownloadError("ERROR: unable to write data", (OSError, cause, None))
+        self.assertFalse(self.engine.is_transient_error(error))
+
+
+class FfmpegProgressTest(unittest.TestCase):
+    def read(self, output, jobs):
+        update_queue = queue.Queue()
+        process = SimpleNamespace(stdout=io.BytesIO(output))
+        with mock.patch.object(downloader_engine, "PROGRESS_UPDATE_INTERVAL", 0):
+            make_engine()._read_ffmpeg_progress(process, jobs, update_queue, 100)
+        return update_queue
+    
+    def test_out_time_us_is_percent_of_duration(self):
+        job = VideoJob("u1")
+        self.read(b"frame=10\nout_time_us=N/A\nprogress=continue\nout_time_us=25000000\nprogress=end\n", [job])
+        self.assertEqual(job.progress_state.progress, 25)
+    
+    def test_progress_stays_below_100_until_finished(self):
+        job = VideoJob("u1")
+        self.read(b"out_time_us=250000000\nprogress=end\n", [job])
+        self.assertEqual(job.progress_state.progress, 99)
+    
+    def test_batch_progress_reaches_every_job(self):
+        jobs = [VideoJob("u1"), VideoJob("u2")]
+        update_queue = self.read(b"out_time_us=50000000\nprogress=end\n", jobs)
+        self.assertEqual([job.progress_state.progress for job in jobs], [50, 50])
+        self.assertEqual([update_queue.get_nowait(), update_queue.get_nowait()], jobs)
+
+
+class ProbeVideoTest(unittest.TestCase):
+    def setUp(self):
+        downloader_engine._probe_file.cache_clear()
+        handle, self.video = tempfile.mkstemp(suffix=".mkv")
+        os.close(handle)
+        self.addCleanup(os.unlink, self.video)
+    
+    def probe(self, data):
+        result = SimpleNamespace(stdout=json.dumps(data))
+        with mock.patch.object(downloader_engine.subprocess, "run", return_value=result) as run:
+            probe = make_engine().probe_video(self.video)
+        return probe, run
+    
+    def streams(self, r_frame_rate, avg_frame_rate, audio_bit_rate="128000"):
+        return {
+            'streams': [
+                {'codec_type': 'video', 'codec_name': 'h264', 'pix_fmt': 'yuv420p', 'width': 1920, 'height': 1080,
+                 'r_frame_rate': r_frame_rate, 'avg_frame_rate': avg_frame_rate},
+                {'codec_type': 'audio', 'codec_name': 'aac', 'bit_rate': audio_bit_rate},
+            ],
+            'format': {'duration': '12.5'},
+        }
+    
+    def test_ntsc_rate_is_normalized_and_cfr(self):
+        probe, _ = self.probe(self.streams("30000/1001", "30000/1001"))
+        self.assertEqual(probe['fps'], 30)
+        self.assertEqual(probe['fps_exact'], "30000/1001")
+        self.assertTrue(probe['is_cfr'])
+        self.assertEqual((probe['duration'], probe['audio_codec'], probe['audio_bitrate']), (12.5, 'aac', 128000))
+    
+    def test_differing_average_rate_is_vfr(self):
+        probe, _ = self.probe(self.streams("60/1", "5317/90", audio_bit_rate="N/A"))
+        self.assertEqual(probe['fps'], 60)
+        self.assertFalse(probe['is_cfr'])
+        self.assertEqual(probe['audio_bitrate'], 0)
+    
+    def test_result_is_cached_per_file_version(self):
+        _, run = self.probe(self.streams("25/1", "25/1"))
+        _, run_again = self.probe(self.streams("25/1", "25/1"))
+        run.assert_called_once()
+        run_again.assert_not_called()
+    
+    def test_ffprobe_failure_falls_back(self):
+        error = subprocess.CalledProcessError(1, "ffprobe")
+        with mock.patch.object(downloader_engine.subprocess, "run", side_effect=error):
+            self.assertEqual(make_engine().probe_video(self.video), downloader_engine.PROBE_FALLBACK)
+        self.assertEqual(make_engine().probe_video(self.video + ".missing"), downloader_engine.PROBE_FALLBACK)
+
+
+class CommandBuilderTest(unittest.TestCase):
+    def test_ytdlp_pipe_command(self):
+        ydl_opts = {
+            'format': 'bestvideo+bestaudio', 'http_chunk_size': 10485760, 'retries': 10, 'fragment_retries': 10,
+            'extractor_args': {'youtube': {'player_client': ['android', 'web']}},
+        }
+        url = "https://www.youtube.com/watch?v=abc"
+        cmd = make_engine().build_ytdlp_pipe_command(url, {'format_id': '137+140'}, ydl_opts)
+        
+        self.assertEqual(cmd[cmd.index("-f") + 1], "137+140")
+        self.assertEqual(cmd[cmd.index("-o") + 1], "-")
+        self.assertEqual(cmd[cmd.index("--http-chunk-size") + 1], "10485760")
+        self.assertEqual(cmd[cmd.index("--extractor-args") + 1], "youtube:player_client=android,web")
+        self.assertNotIn("--cookies", cmd)
+        self.assertEqual(cmd[-1], url)
+    
+    def test_hevc10_command(self):
+        engine = make_engine()
+        engine.nvenc_caps = {"p_presets"}
+        cmd = engine.build_hevc10_command("https://v/a", "out.mov", 24, "https://a/a", video_codec="avc1.640028")
+        
+        self.assertEqual([cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"], ["https://v/a", "https://a/a"])
+        self.assertIn("fps=fps=24,scale_cuda=format=p010le", cmd)
+        for option, value in (("-c:v", "hevc_nvenc"), ("-preset", "p6"), ("-profile:v", "main10"),
+                              ("-c:a", "pcm_s16le")):
+            self.assertEqual(cmd[cmd.index(option) + 1], value)
+        self.assertEqual(cmd[-1], "out.mov")
+        
+        engine.nvenc_caps = set()
+        cmd = engine.build_hevc10_command("in.mkv", "out.mov", 24, video_codec="h264")
+        self.assertEqual(cmd[cmd.index("-preset") + 1], "slow")
+        self.assertNotIn("-tune", cmd)
+    
+    def test_fast_tier_has_no_lookahead_with_low_latency_tune(self):
+        engine = make_engine()
+        engine.nvenc_caps = {"p_presets"}
+        cmd = engine.build_h264_video_args(30, "fast", video_codec="h264")
+        self.assertEqual(cmd[cmd.index("-tune") + 1], "ll")
+        self.assertEqual(cmd[cmd.index("-rc-lookahead") + 1], "0")
+
+
+class SelectOutputCodecTest(unittest.TestCase):
+    def select(self, resolution, hevc_4k=True, encoders=frozenset({"h264_nvenc", "hevc_nvenc"}), hw_encoder="nvenc"):
+        engine = make_engine(hw_encoder=hw_encoder)
+        engine.hevc_4k = hevc_4k
+        with mock.patch.object(downloader_engine, "_ffmpeg_encoders", return_value=encoders):
+            return engine.select_output_codec(resolution)
+    
+    def test_hevc_only_for_4k_when_chosen(self):
+        self.assertEqual(self.select("4K (2160p)"), "hevc")
+        self.assertEqual(self.select("1080p (Full HD)"), "h264")
+        self.assertEqual(self.select("4K (2160p)", hevc_4k=False), "h264")
+    
+    def test_h264_without_hardware_hevc(self):
+        self.assertEqual(self.select("4K (2160p)", encoders=frozenset({"h264_nvenc"})), "h264")
+        self.assertEqual(self.select("4K (2160p)", hw_encoder=None, encoders=frozenset({"libx265"})), "h264")
+
+
+class MetaCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.object(downloader_engine, "META_CACHE_FILE", Path(self.cache_dir.name) / "meta.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def engine(self):
+        engine = make_engine()
+        engine._meta_lock = threading.Lock()
+        engine._meta_write_lock = threading.Lock()
+        engine._meta_save_timer = None
+        engine._meta_cache = engine.load_meta_cache()
+        return engine
+    
+    def test_expired_entries_are_dropped(self):
+        now = time.time()
+        downloader_engine.META_CACHE_FILE.write_text(json.dumps({
+            "fresh": {'time': now - 60, 'title': "Fresh"},
+            "stale": {'time': now - downloader_engine.META_CACHE_TTL - 1, 'title': "Stale"},
+        }))
+        self.assertEqual(list(self.engine()._meta_cache), ["fresh"])
+    
+    def test_entries_are_keyed_by_url_and_replaced(self):
+        engine = self.engine()
+        job = VideoJob("https://youtu.be/abc")
+        for title in ("Old title", "New title"):
+            job.title = title
+            engine.store_meta(job)
+        engine._meta_save_timer.cancel()
+        engine.save_meta_cache()
+        
+        self.assertEqual(self.engine()._meta_cache[job.url]['title'], "New title")
+        self.assertEqual(os.listdir(self.cache_dir.name), ["meta.json"])
+    
+    def test_unreadable_cache_starts_empty(self):
+        downloader_engine.META_CACHE_FILE.write_text("{not json")
+        self.assertEqual(self.engine()._meta_cache, {})
+
+
+class CapsCacheTest(unittest.TestCase):
+    CAPS = {
+        'version': downloader_engine.CAPS_CACHE_VERSION, 'ffmpeg_id': "ffmpeg:1:1", 'hw_encoder': "nvenc",
+        'nvenc_caps': ["p_presets"], 'hwaccel_flag': "cuda", 'prores_encoder': "prores_ks", 'cuda_scale_format': True,
+    }
+    
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_file = Path(cache_dir.name) / "caps.json"
+        for patcher in (mock.patch.object(downloader_engine, "CAPS_CACHE_FILE", self.cache_file),
+                        mock.patch.object(DownloaderEngine, "_CAPS", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def load(self, cached, ffmpeg_id="ffmpeg:1:1"):
+        """Load caps with the given cache file; returns the engine and whether FFmpeg was probed"""
+        self.cache_file.write_text(json.dumps(cached))
+        engine = DownloaderEngine.__new__(DownloaderEngine)
+        with mock.patch.object(downloader_engine, "_ffmpeg_id", return_value=ffmpeg_id), \
+                mock.patch.object(downloader_engine, "_ffmpeg_encoders", return_value=frozenset()), \
+                mock.patch.object(downloader_engine, "_ffmpeg_hwaccels", return_value=[]), \
+                mock.patch.object(DownloaderEngine, "detect_cuda_scale_format", return_value=False), \
+                mock.patch.object(DownloaderEngine, "detect_nvenc_caps", return_value=set()) as detect:
+            engine.load_ffmpeg_caps()
+        return engine, detect.called
+    
+    def test_matching_cache_is_used(self):
+        engine, probed = self.load(self.CAPS)
+        self.assertFalse(probed)
+        self.assertEqual((engine.hw_encoder, engine.nvenc_caps, engine.cuda_scale_format), ("nvenc", {"p_presets"}, True))
+    
+    def test_new_ffmpeg_build_or_version_reprobes(self):
+        for cached, ffmpeg_id in ((self.CAPS, "ffmpeg:2:2"), ({**self.CAPS, 'version': 1}, "ffmpeg:1:1")):
+            DownloaderEngine._CAPS = None
+            engine, probed = self.load(cached, ffmpeg_id)
+            self.assertTrue(probed)
+            self.assertIsNone(engine.hw_encoder)
+            self.assertEqual(json.loads(self.cache_file.read_text())['ffmpeg_id'], ffmpeg_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+"""Tests for finding YouTube URLs in pasted or dropped text"""
+
+import unittest
+
+from downloader_engine import find_youtube_url
+
+
+class FindYoutubeUrlTest(unittest.TestCase):
+    def test_url_inside_a_paragraph(self):
+        text = "Check this out: https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42 - it's great."
+        self.assertEqual(find_youtube_url(text), "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42")
+    
+    def test_schemeless_urls_get_https(self):
+        self.assertEqual(find_youtube_url("see youtube.com/watch?v=abc123"), "https://youtube.com/watch?v=abc123")
+        self.assertEqual(find_youtube_url("www.youtube.com/playlist?list=PL1"), "https://www.youtube.com/playlist?list=PL1")
+        self.assertEqual(find_youtube_url("youtu.be/abc123"), "https://youtu.be/abc123")
+    
+    def test_shorts_embed_and_nocookie(self):
+        self.assertEqual(find_youtube_url("https://youtube.com/shorts/abc123"), "https://youtube.com/shorts/abc123")
+        self.assertEqual(find_youtube_url('<iframe src="https://www.youtube-nocookie.com/embed/abc123">'),
+                         "https://www.youtube-nocookie.com/embed/abc123")
+        self.assertEqual(find_youtube_url("http://m.youtube.com/embed/abc123"), "http://m.youtube.com/embed/abc123")
+    
+    def test_non_youtube_text(self):
+        for text in ("https://vimeo.com/123456", "https://notyoutube.com/watch?v=abc123",
+                     "https://www.youtube.com/", "no links here", ""):
+            self.assertIsNone(find_youtube_url(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()